@@ -0,0 +1,70 @@
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from .cache import ingredients_catalog
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize(text):
+    """
+    Приводит строку к виду для сравнения по префиксу.
+
+    casefold корректно обрабатывает кириллицу, а «ё» приравнивается к «е».
+    """
+    return text.casefold().replace('ё', 'е').strip()
+
+
+class PrefixIndex:
+    """
+    Индекс для поиска по началу названия в отсортированном массиве.
+
+    Строится из сериализованного справочника (CatalogCache) и
+    перестраивается при смене его версии. Поиск выполняется двоичным
+    поиском за O(log n) без обращения к базе данных.
+    """
+
+    def __init__(self, catalog, field='name', limit=None):
+        self.catalog = catalog
+        self.field = field
+        self.limit = limit
+        self._index = None
+
+    def _get_index(self):
+        entry = self.catalog.get()
+        index = self._index
+        if (
+            index is None or entry.version is None
+            or index[0] != entry.version
+        ):
+            pairs = sorted(
+                (
+                    (normalize(item[self.field]), position)
+                    for position, item in enumerate(entry.data)
+                )
+            )
+            index = (
+                entry.version,
+                [key for key, _ in pairs],
+                [entry.data[position] for _, position in pairs],
+            )
+            self._index = index
+        return index
+
+    def search(self, prefix, limit=None):
+        """Возвращает элементы, название которых начинается с prefix."""
+        _, keys, items = self._get_index()
+        prefix = normalize(prefix)
+        start = bisect_left(keys, prefix)
+        end = bisect_right(keys, prefix + MAX_CHAR, lo=start)
+        limit = limit or self.limit
+        if limit is not None:
+            end = min(end, start + limit)
+        return items[start:end]
+
+
+ingredients_autocomplete = PrefixIndex(
+    ingredients_catalog,
+    limit=settings.INGREDIENTS_AUTOCOMPLETE_LIMIT
+)
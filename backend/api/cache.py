@@ -0,0 +1,143 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from recipes.cache import get_version, get_versions
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+
+from .serializers import IngredientSerializer, TagSerializer
+
+CatalogEntry = namedtuple('CatalogEntry', ['version', 'etag', 'data'])
+
+
+class CatalogCache:
+    """
+    Кэш сериализованного справочника в памяти воркера.
+
+    Данные перестраиваются только при смене версии модели
+    (см. recipes.cache). ETag строится из версии, поэтому для ответа 304
+    достаточно прочитать версию, не обращаясь к базе данных.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self._entry = None
+
+    def make_etag(self, version):
+        """Возвращает строгий ETag для версии справочника."""
+        return f'"{self.model._meta.model_name}-{version}"'
+
+    def get_etag(self):
+        """Возвращает ETag актуальной версии справочника."""
+        return self.make_etag(get_version(self.model))
+
+    def get(self):
+        """Возвращает актуальную запись кэша, перестраивая её при нужде."""
+        version = get_version(self.model)
+        entry = self._entry
+        if entry is not None and version is not None and (
+            entry.version == version
+        ):
+            return entry
+        entry = CatalogEntry(
+            version,
+            self.make_etag(version),
+            list(self.serializer_class(
+                self.model.objects.all(), many=True
+            ).data),
+        )
+        if version is not None:
+            self._entry = entry
+        return entry
+
+
+tags_catalog = CatalogCache(Tag, TagSerializer)
+ingredients_catalog = CatalogCache(Ingredient, IngredientSerializer)
+
+
+class ResponseCache:
+    """
+    Кэш данных ответов для анонимных GET-запросов.
+
+    Ключ строится из действия, нормализованных параметров запроса и
+    поколений (версий) моделей, от которых зависит ответ. Любое изменение
+    этих моделей увеличивает поколение, и старые ключи больше не
+    используются, поэтому устаревшие данные не отдаются. Бэкенд задаётся
+    алиасом из CACHES (RESPONSE_CACHE_ALIAS).
+    """
+
+    def __init__(self, prefix, models, allowed_params, list_params=(),
+                 volatile_orderings=()):
+        self.prefix = prefix
+        self.models = models
+        self.allowed_params = frozenset(allowed_params)
+        self.list_params = frozenset(list_params)
+        self.volatile_orderings = frozenset(volatile_orderings)
+
+    @property
+    def cache(self):
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def normalize_params(self, query_params):
+        """
+        Приводит параметры запроса к каноническому виду.
+
+        Возвращает None, если среди параметров есть неизвестные: такие
+        запросы не кэшируются, чтобы не раздувать кэш. Не кэшируется и
+        сортировка по полям из volatile_orderings: они меняются без смены
+        поколений моделей (баллы популярности).
+        """
+        if not self.allowed_params.issuperset(query_params):
+            return None
+        if self.volatile_orderings & {
+            field.strip().lstrip('-')
+            for value in query_params.getlist('ordering')
+            for field in value.split(',')
+        }:
+            return None
+        params = []
+        for name in sorted(query_params):
+            values = query_params.getlist(name)
+            if name in self.list_params:
+                values = sorted({
+                    item for value in values
+                    for item in value.split(',') if item
+                })
+            params.append((name, tuple(values)))
+        return tuple(params)
+
+    def make_key(self, request, *parts):
+        """Возвращает ключ кэша для запроса или None."""
+        if request.method != 'GET' or request.user.is_authenticated:
+            return None
+        params = self.normalize_params(request.query_params)
+        if params is None:
+            return None
+        digest = hashlib.md5(repr((
+            request.build_absolute_uri('/'),
+            parts,
+            params,
+            get_versions(*self.models),
+        )).encode()).hexdigest()
+        return f'response:{self.prefix}:{digest}'
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, data):
+        self.cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+recipes_response_cache = ResponseCache(
+    'recipes',
+    models=(Recipe, RecipeIngredient, Tag, Ingredient, User),
+    allowed_params=(
+        'tags', 'author', 'page', 'limit', 'ordering',
+        'is_favorited', 'is_in_shopping_cart', 'pagination', 'cursor',
+        'cooking_time', 'search',
+    ),
+    list_params=('tags',),
+    volatile_orderings=('trending',),
+)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin
+from drf_extra_fields.fields import Base64ImageField as DRFBase64ImageField
+from rest_framework.exceptions import ValidationError
+
+BASE64_HEADER = ';base64,'
+
+
+class ImageUploadField(DRFBase64ImageField):
+    """
+    Изображение в виде base64-строки или файла из multipart-формы.
+
+    Оба варианта проходят одну проверку размера и содержимого. Файл из
+    формы не декодируется повторно: Django уже сохранил его во временный
+    файл, и Pillow читает его с диска.
+    """
+
+    def check_size(self, size):
+        """Проверяет размер изображения в байтах."""
+        if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise ValidationError(
+                f'Размер изображения превышает '
+                f'{settings.MAX_IMAGE_UPLOAD_SIZE} байт.'
+            )
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            self.check_size(data.size)
+            return super(Base64FieldMixin, self).to_internal_value(data)
+        if isinstance(data, str):
+            encoded = data.partition(BASE64_HEADER)[2] or data
+            self.check_size(len(encoded) * 3 // 4)
+        return super().to_internal_value(data)
@@ -1,5 +1,9 @@
 import django_filters
+from django.db.models import Exists, OuterRef
+from recipes.cooking_time import get_cooking_time_range
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.search import search_recipes
+from rest_framework.filters import OrderingFilter
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -11,6 +15,8 @@ class RecipeFilter(django_filters.FilterSet):
         author: ID автора
         is_favorited: 1 - только избранные, 0 - все
         is_in_shopping_cart: 1 - только в корзине, 0 - все
+        cooking_time: fast, medium или slow - группа времени готовки
+        search: полнотекстовый поиск по названию, описанию и ингредиентам
     """
 
     tags = django_filters.CharFilter(method='filter_tags')
@@ -27,18 +33,42 @@ class RecipeFilter(django_filters.FilterSet):
         method='filter_is_in_shopping_cart'
     )
 
+    cooking_time = django_filters.CharFilter(
+        method='filter_cooking_time'
+    )
+
+    search = django_filters.CharFilter(
+        method='filter_search'
+    )
+
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'cooking_time', 'search'
+        ]
 
     def filter_tags(self, recipes, name, value):
-        """Фильтрует рецепты по slug тегов."""
+        """
+        Фильтрует рецепты по slug тегов.
+
+        Использует полусоединение (EXISTS) по промежуточной таблице вместо
+        JOIN с DISTINCT, чтобы не дублировать и не пересортировывать
+        строки рецептов.
+        """
         tags = self.request.query_params.getlist(name)
         if len(tags) == 1 and ',' in tags[0]:
             tags = [tag for tag in tags[0].split(',') if tag]
         if not tags:
             return recipes
-        return recipes.filter(tags__slug__in=tags).distinct()
+        return recipes.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef('pk'),
+                    tag__slug__in=tags
+                )
+            )
+        )
 
     def filter_is_favorited(self, recipes, name, value):
         """
@@ -78,6 +108,58 @@ class RecipeFilter(django_filters.FilterSet):
             return recipes.none()
         return recipes
 
+    def filter_cooking_time(self, recipes, name, value):
+        """Фильтрует рецепты по группе времени готовки."""
+        cooking_time_range = get_cooking_time_range(value)
+        if cooking_time_range is None:
+            return recipes
+        return recipes.filter(cooking_time__range=cooking_time_range)
+
+    def filter_search(self, recipes, name, value):
+        """
+        Полнотекстовый поиск с оценкой релевантности (search_rank).
+
+        Использует индекс GIN на PostgreSQL и таблицу FTS5 на SQLite.
+        """
+        if not value.strip():
+            return recipes
+        return search_recipes(recipes, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    Сортировка рецептов.
+
+    При поиске по умолчанию сортирует по релевантности. Параметр
+    ordering=-trending сортирует по баллу популярности
+    (Recipe.trending_score); к заданной сортировке добавляется id, чтобы
+    рецепты с равными значениями не менялись местами между страницами.
+    """
+
+    field_aliases = {'trending': 'trending_score'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = [
+            self._resolve(field)
+            for field in super().remove_invalid_fields(
+                queryset, fields, view, request
+            )
+        ]
+        if fields and not {'id', '-id'} & set(fields):
+            fields.append('-id' if fields[-1].startswith('-') else 'id')
+        return fields
+
+    def _resolve(self, field):
+        descending = field.startswith('-')
+        name = self.field_aliases.get(field.lstrip('-'), field.lstrip('-'))
+        return f'-{name}' if descending else name
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if view.request.query_params.get('search', '').strip():
+            return ('-search_rank', *ordering)
+        return ordering
+
 
 class IngredientFilter(django_filters.FilterSet):
     """Фильтрация ингредиентов по началу названия."""
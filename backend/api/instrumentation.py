@@ -0,0 +1,94 @@
+import hashlib
+import logging
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Обёртка выполнения SQL, собирающая статистику запросов.
+
+    Отпечаток запроса — текст SQL без параметров, поэтому одинаковые
+    запросы с разными параметрами (типичный N+1) считаются повторами.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            self.fingerprints[sql] += 1
+
+    def capture(self):
+        """Подключает обёртку ко всем соединениям с базой."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def duplicates(self):
+        """Повторяющиеся запросы: {отпечаток: число выполнений}."""
+        return {
+            sql: count for sql, count in self.fingerprints.most_common()
+            if count > 1
+        }
+
+    @staticmethod
+    def short_fingerprint(sql):
+        return hashlib.md5(sql.encode()).hexdigest()[:8]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL-запросы каждого запроса к приложению.
+
+    Включается настройкой QUERY_INSTRUMENTATION. Добавляет в ответ
+    заголовки с числом запросов, суммарным временем SQL и повторяющимися
+    запросами. Запросы, выполненные при потоковой отдаче ответа,
+    в заголовки не попадают.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with stats.capture():
+            response = self.get_response(request)
+
+        duplicates = stats.duplicates
+        response['X-DB-Query-Count'] = str(stats.count)
+        response['X-DB-Query-Time-Ms'] = f'{stats.duration * 1000:.2f}'
+        response['X-DB-Duplicate-Queries'] = str(
+            sum(duplicates.values()) - len(duplicates)
+        )
+        if duplicates:
+            response['X-DB-Duplicate-Fingerprints'] = ', '.join(
+                f'{stats.short_fingerprint(sql)}*{count}'
+                for sql, count in duplicates.items()
+            )
+            for sql, count in duplicates.items():
+                logger.debug(
+                    '%s %s: %s x%d',
+                    request.method, request.path,
+                    stats.short_fingerprint(sql), count
+                )
+                logger.debug('%s', sql)
+        return response
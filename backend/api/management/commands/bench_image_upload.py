@@ -0,0 +1,108 @@
+import base64
+import io
+import os
+import tempfile
+import tracemalloc
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Tag, User
+
+MEBIBYTE = 1024 * 1024
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает потребление памяти при загрузке изображения рецепта.
+
+    Отправляет одно и то же изображение в create рецепта как base64
+    в JSON и как файл в multipart-форме и выводит пик памяти Python
+    (tracemalloc) и время обработки запроса. Тело запроса собирается
+    заранее и в замер не входит. Все изменения откатываются.
+    """
+
+    help = 'Сравнивает память при загрузке изображения в base64 и multipart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size-mb',
+            type=float,
+            default=10,
+            help='Примерный размер изображения в мегабайтах'
+        )
+
+    def make_image(self, size):
+        """Создаёт PNG из шума примерно заданного размера."""
+        side = int((size / 3) ** 0.5)
+        buffer = io.BytesIO()
+        Image.frombytes(
+            'RGB', (side, side), os.urandom(side * side * 3)
+        ).save(buffer, 'PNG', compress_level=0)
+        return buffer.getvalue()
+
+    def make_requests(self, image, tag, ingredient):
+        factory = APIRequestFactory()
+        fields = {
+            'name': 'Замер памяти',
+            'text': 'Описание',
+            'cooking_time': 1,
+        }
+        json_request = factory.post('/api/recipes/', {
+            **fields,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 1}],
+            'image': 'data:image/png;base64,'
+                     + base64.b64encode(image).decode(),
+        }, format='json')
+        upload = io.BytesIO(image)
+        upload.name = 'image.png'
+        multipart_request = factory.post('/api/recipes/', {
+            **fields,
+            'tags': [tag.id],
+            'ingredients[0]id': ingredient.id,
+            'ingredients[0]amount': 1,
+            'image': upload,
+        }, format='multipart')
+        return [('base64', json_request), ('multipart', multipart_request)]
+
+    def measure(self, request, user):
+        force_authenticate(request, user)
+        view = RecipeViewSet.as_view({'post': 'create'})
+        tracemalloc.start()
+        start = default_timer()
+        response = view(request)
+        elapsed = default_timer() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        request.close()
+        return response.status_code, peak, elapsed
+
+    def handle(self, *args, **options):
+        image = self.make_image(options['size_mb'] * MEBIBYTE)
+        self.stdout.write(f'Изображение: {len(image) / MEBIBYTE:.1f} МБ')
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root), \
+                transaction.atomic():
+            user = User.objects.create_user(
+                email='bench-upload@example.com', username='bench-upload',
+                first_name='Замер', last_name='Памяти'
+            )
+            tag = Tag.objects.create(name='Замер', slug='bench-upload')
+            ingredient = Ingredient.objects.create(
+                name='замер памяти', measurement_unit='г'
+            )
+            requests = self.make_requests(image, tag, ingredient)
+            for label, request in requests:
+                status, peak, elapsed = self.measure(request, user)
+                self.stdout.write(
+                    f'{label:10} статус {status}, '
+                    f'пик памяти {peak / MEBIBYTE:7.1f} МБ, '
+                    f'время {elapsed * 1000:7.1f} мс'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,77 @@
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from api.autocomplete import ingredients_autocomplete
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает скорость поиска ингредиентов по началу названия.
+
+    Запускает одинаковый набор префиксов через ORM (name__istartswith)
+    и через индекс в памяти и выводит среднее время одного запроса.
+    """
+
+    help = 'Сравнивает поиск ингредиентов через ORM и индекс в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз повторить набор префиксов'
+        )
+        parser.add_argument(
+            'prefixes',
+            nargs='*',
+            help='Префиксы для поиска (по умолчанию — из справочника)'
+        )
+
+    def get_prefixes(self):
+        names = Ingredient.objects.values_list('name', flat=True)[::50]
+        return sorted({
+            name[:length] for name in names for length in (1, 2, 3)
+        })
+
+    def measure(self, search, prefixes, repeat):
+        found = 0
+        start = default_timer()
+        for _ in range(repeat):
+            for prefix in prefixes:
+                found += len(search(prefix))
+        elapsed = default_timer() - start
+        return elapsed / (repeat * len(prefixes)), found
+
+    def handle(self, *args, **options):
+        prefixes = options['prefixes'] or self.get_prefixes()
+        if not prefixes:
+            self.stdout.write(self.style.ERROR('Справочник ингредиентов пуст'))
+            return
+        repeat = options['repeat']
+        ingredients_autocomplete.search('')
+
+        orm_time, orm_found = self.measure(
+            lambda prefix: IngredientSerializer(
+                Ingredient.objects.filter(name__istartswith=prefix),
+                many=True
+            ).data,
+            prefixes,
+            repeat
+        )
+        index_time, index_found = self.measure(
+            ingredients_autocomplete.search, prefixes, repeat
+        )
+
+        self.stdout.write(
+            f'Префиксов: {len(prefixes)}, повторов: {repeat}\n'
+            f'ORM:    {orm_time * 1e6:10.1f} мкс/запрос '
+            f'(найдено {orm_found})\n'
+            f'Индекс: {index_time * 1e6:10.1f} мкс/запрос '
+            f'(найдено {index_found})'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: x{orm_time / index_time:.1f}'
+        ))
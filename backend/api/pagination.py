@@ -1,4 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination, _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -11,3 +19,120 @@ class LimitPageNumberPagination(PageNumberPagination):
 
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация рецептов.
+
+    Сортирует по дате создания с id в качестве разделителя одинаковых дат,
+    что соответствует составному индексу модели Recipe. Вместо номера
+    страницы возвращает непрозрачные курсоры next/previous и не выполняет
+    запрос COUNT.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-created_at', '-id')
+
+
+class RecipePagination(LimitPageNumberPagination):
+    """
+    Пагинация ленты рецептов.
+
+    По умолчанию работает постранично. Курсорный режим включается
+    параметром pagination=cursor или наличием параметра cursor.
+    """
+
+    cursor_pagination_class = RecipeCursorPagination
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def is_cursor_mode(self, request):
+        """Проверяет, запрошен ли курсорный режим."""
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_cursor_mode(request):
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.cursor_pagination_class()
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is None:
+            return super().get_paginated_response(data)
+        return self.cursor_paginator.get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """
+    Keyset-пагинация ленты по позициям (дата создания, id рецепта).
+
+    В отличие от RecipeCursorPagination работает не с QuerySet, а с
+    функцией fetch(before, limit), которая возвращает позиции после
+    before. Курсор next кодирует последнюю позицию страницы; переход
+    возможен только вперёд, COUNT не выполняется.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, recipe_id = b64decode(
+                encoded.encode('ascii'), altchars=b'-_', validate=True
+            ).decode('ascii').split(' ')
+            return datetime.fromisoformat(created_at), int(recipe_id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        created_at, recipe_id = position
+        return b64encode(
+            f'{created_at.isoformat()} {recipe_id}'.encode('ascii'),
+            altchars=b'-_'
+        ).decode('ascii')
+
+    def paginate(self, fetch, request):
+        """Возвращает позиции страницы, запоминая курсор следующей."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        positions = fetch(self.decode_cursor(request), page_size + 1)
+        self.next_position = (
+            positions[page_size - 1] if len(positions) > page_size else None
+        )
+        return positions[:page_size]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -1,56 +1,92 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
-from drf_extra_fields.fields import Base64ImageField as DRFBase64ImageField
-from recipes.constants import MIN_AMOUNT, MIN_COOKING_TIME
+from recipes.constants import (MAX_BULK_RECIPES, MAX_PANTRY_INGREDIENTS,
+                               MIN_AMOUNT, MIN_COOKING_TIME)
+from recipes.images import recipe_images, user_avatars
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Subscription, Tag, User)
+                            ShoppingCart, Tag, User)
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from .fields import ImageUploadField
+from .utils import SubscriptionResolver, get_recipes_limit
+
 
 class UsersBaseSerializer(DjoserUserSerializer):
     """Миксин для сериализаторов пользователей."""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = serializers.SerializerMethodField()
+
+    def get_avatar_variants(self, user):
+        """Возвращает URL уменьшенных копий аватара, если они готовы."""
+        return user_avatars.get_urls(user, self.context.get('request'))
 
     def get_is_subscribed(self, user):
         """
         Проверяет, подписан ли текущий пользователь на данного пользователя.
+
+        Подписки разрешаются одним запросом на весь ответ.
         """
-        request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and Subscription.objects.filter(
-                    user=request.user,
-                    author=user).exists()
-                )
+        return SubscriptionResolver.from_serializer(self).is_subscribed(user)
 
     class Meta(DjoserUserSerializer.Meta):
-        fields = [*DjoserUserSerializer.Meta.fields, 'avatar', 'is_subscribed']
+        fields = [
+            *DjoserUserSerializer.Meta.fields,
+            'avatar', 'avatar_variants', 'is_subscribed'
+        ]
         read_only_fields = fields
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class RecipeImageVariantsMixin(serializers.Serializer):
+    """Миксин, добавляющий URL уменьшенных копий изображения рецепта."""
+
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, recipe):
+        """Возвращает URL вариантов изображения, если они готовы."""
+        return recipe_images.get_urls(recipe, self.context.get('request'))
+
+
+class ShortRecipeSerializer(RecipeImageVariantsMixin,
+                            serializers.ModelSerializer):
     """Сериализатор для краткого представления рецепта."""
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_variants', 'cooking_time']
+        read_only_fields = fields
+
+
+class SimilarRecipeSerializer(ShortRecipeSerializer):
+    """Похожий рецепт с мерой сходства (от 0 до 1)."""
+
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(ShortRecipeSerializer.Meta):
+        fields = [*ShortRecipeSerializer.Meta.fields, 'similarity']
         read_only_fields = fields
 
 
 class UserWithRecipesSerializer(UsersBaseSerializer):
-    """Сериализатор пользователя с его рецептами."""
+    """
+    Сериализатор пользователя с его рецептами.
+
+    Использует рецепты, подгруженные prefetch_author_recipes, если они есть.
+    """
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count', read_only=True)
 
     def get_recipes(self, user):
         """Метод для получения рецептов"""
-        recipes_limit = int(self.context.get('request').query_params.get(
-            'recipes_limit',
-            10 ** 10
-        ))
-        recipes = user.recipes.all()[:recipes_limit]
+        recipes = getattr(user, 'limited_recipes', None)
+        if recipes is None:
+            recipes = user.recipes.all()[
+                :get_recipes_limit(self.context.get('request'))
+            ]
         return ShortRecipeSerializer(recipes, many=True).data
 
     class Meta(UsersBaseSerializer.Meta):
@@ -58,13 +94,49 @@ class UserWithRecipesSerializer(UsersBaseSerializer):
         read_only_fields = fields
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка ID рецептов для массовых операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES
+    )
+
+    def validate_recipes(self, recipe_ids):
+        """Убирает повторы, сохраняя порядок."""
+        return list(dict.fromkeys(recipe_ids))
+
+
+class IngredientIdsSerializer(serializers.Serializer):
+    """Сериализатор списка ID ингредиентов для подбора рецептов."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_PANTRY_INGREDIENTS
+    )
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для получения аватара пользователя."""
-    avatar = DRFBase64ImageField(required=True)
+    avatar = ImageUploadField(required=True)
+    avatar_variants = serializers.SerializerMethodField()
+
+    def get_avatar_variants(self, user):
+        """Возвращает URL уменьшенных копий аватара, если они готовы."""
+        return user_avatars.get_urls(user, self.context.get('request'))
 
     class Meta:
         model = User
-        fields = ['avatar']
+        fields = ['avatar', 'avatar_variants']
+
+    def update(self, instance, validated_data):
+        previous = instance.avatar.name
+        instance = super().update(instance, validated_data)
+        if previous != instance.avatar.name:
+            user_avatars.delete_variants_on_commit(previous)
+        return instance
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -100,17 +172,15 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
 class IngredientAmountCreateSerializer(serializers.Serializer):
     """Сериализатор для создания ингредиента с количеством."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        required=True
-    )
+    id = serializers.IntegerField(required=True)
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT,
         required=True
     )
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(RecipeImageVariantsMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для чтения модели Recipe."""
 
     tags = TagSerializer(many=True, read_only=True)
@@ -123,8 +193,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
-    def _check_user_relation(self, obj, model_class):
-        """Проверяет связь пользователя с объектом."""
+    def _check_user_relation(self, obj, model_class, annotation):
+        """
+        Проверяет связь пользователя с объектом.
+
+        Если queryset уже аннотирован флагом (см. RecipeViewSet.get_queryset),
+        используется он, иначе выполняется отдельный запрос.
+        """
+        annotated = getattr(obj, annotation, None)
+        if annotated is not None:
+            return annotated
         request = self.context.get('request')
         return (
             request
@@ -137,17 +215,34 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         """Проверяет, добавил ли пользователь рецепт в избранное."""
-        return self._check_user_relation(obj, Favorite)
+        return self._check_user_relation(obj, Favorite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяет, находится ли рецепт в корзине пользователя."""
-        return self._check_user_relation(obj, ShoppingCart)
+        return self._check_user_relation(
+            obj, ShoppingCart, 'is_in_shopping_cart'
+        )
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time'
+        ]
+        read_only_fields = fields
+
+
+class PantryRecipeSerializer(RecipeReadSerializer):
+    """Рецепт в подборе по ингредиентам: сколько совпало и не хватает."""
+
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = [
+            *RecipeReadSerializer.Meta.fields,
+            'matched_count', 'missing_count'
         ]
         read_only_fields = fields
 
@@ -155,15 +250,14 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления модели Recipe."""
 
-    image = DRFBase64ImageField(required=True)
+    image = ImageUploadField(required=True)
     text = serializers.CharField(required=True)
     cooking_time = serializers.IntegerField(
         min_value=MIN_COOKING_TIME,
         required=True
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
         required=True
     )
     ingredients = IngredientAmountCreateSerializer(
@@ -179,51 +273,99 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'name', 'image', 'text', 'cooking_time'
         ]
 
+    @staticmethod
+    def _check_ids(model, ids, label):
+        """
+        Проверяет ID на повторы и существование объектов.
+
+        Все ID проверяются одним запросом с IN вместо запроса на каждый.
+        """
+        duplicates = sorted(
+            id_ for id_, count in Counter(ids).items() if count > 1
+        )
+        if duplicates:
+            raise ValidationError(f'Повторяющиеся {label}: {duplicates}')
+        missing = sorted(
+            set(ids) - set(model.objects.filter(id__in=ids).values_list(
+                'id', flat=True
+            ))
+        )
+        if missing:
+            raise ValidationError(f'Несуществующие {label}: {missing}')
+
     def _create_ingredients(self, recipe, ingredients_data):
         """Метод для создания ингредиентов рецепта."""
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient_data['id'],
+                ingredient_id=ingredient_data['id'],
                 amount=ingredient_data['amount']
             )
             for ingredient_data in ingredients_data
         )
 
+    def _update_ingredients(self, recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к переданному списку.
+
+        Пишутся только изменившиеся строки: новые создаются, у оставшихся
+        обновляется количество, лишние удаляются одним запросом.
+        """
+        amounts = {item['id']: item['amount'] for item in ingredients_data}
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        removed = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self._create_ingredients(
+            recipe,
+            [item for item in ingredients_data if item['id'] not in current]
+        )
+
+    def validate_ingredients(self, ingredients_data):
+        self._check_ids(
+            Ingredient,
+            [item['id'] for item in ingredients_data],
+            'ингредиенты'
+        )
+        return ingredients_data
+
+    def validate_tags(self, tags):
+        self._check_ids(Tag, tags, 'теги')
+        return tags
+
     def validate(self, attrs):
         ingredient_data = attrs.get('recipe_ingredients')
         tags = attrs.get('tags')
 
-        if ingredient_data is not None:
-            if not ingredient_data:
-                raise ValidationError(
-                    'Рецепт должен содержать хотя бы один ингредиент.'
-                )
-
-            ids = [item['id'].id for item in ingredient_data]
-            if len(ids) != len(set(ids)):
-                duplicates = [i for i in set(ids) if ids.count(i) > 1]
-                raise ValidationError(
-                    f'Повторяющиеся ингредиенты: '
-                    f'{duplicates}'
-                )
-
-        if tags is not None:
-            if not tags:
-                raise ValidationError(
-                    'Рецепт должен содержать хотя бы один тег.'
-                )
-
-            tag_ids = [t.id for t in tags]
-            if len(tag_ids) != len(set(tag_ids)):
-                duplicates = [t for t in set(tag_ids) if tag_ids.count(t) > 1]
-                raise ValidationError(
-                    f'Повторяющиеся теги: '
-                    f'{duplicates}'
-                )
+        if not ingredient_data:
+            raise ValidationError(
+                'Рецепт должен содержать хотя бы один ингредиент.'
+            )
+
+        if not tags:
+            raise ValidationError(
+                'Рецепт должен содержать хотя бы один тег.'
+            )
 
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('recipe_ingredients')
@@ -233,17 +375,24 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        previous_image = instance.image.name
         instance.tags.set(validated_data.pop('tags'))
-        instance.recipe_ingredients.all().delete()
-        self._create_ingredients(
+        self._update_ingredients(
             instance,
             validated_data.pop('recipe_ingredients')
         )
+        instance = super().update(instance, validated_data)
+        if previous_image != instance.image.name:
+            recipe_images.delete_variants_on_commit(previous_image)
 
-        return super().update(instance, validated_data)
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'tags', 'recipe_ingredients__ingredient'
+        )
         return RecipeReadSerializer(
             instance,
             context=self.context
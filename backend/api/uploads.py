@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+
+
+class UploadTooLarge(MultiPartParserError):
+    """Загружаемый файл превышает MAX_IMAGE_UPLOAD_SIZE."""
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """
+    Обрывает загрузку файла, размер которого превышает лимит.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS и передаёт данные следующим
+    обработчикам без изменений, поэтому слишком большой файл не
+    дочитывается до конца и не записывается целиком на диск.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise UploadTooLarge(
+                f'файл {self.file_name} больше '
+                f'{settings.MAX_IMAGE_UPLOAD_SIZE} байт'
+            )
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
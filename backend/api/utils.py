@@ -1,42 +1,297 @@
-from django.db.models import F, Sum
-from django.template.loader import render_to_string
+import csv
+import io
+import json
+from itertools import chain
+
+from django.db.models import (BooleanField, Count, Exists, F, OuterRef,
+                              Prefetch, QuerySet, Sum, Value, Window,
+                              prefetch_related_objects)
+from django.template.defaultfilters import date as date_filter
 from django.utils import timezone
-from recipes.models import RecipeIngredient
+from django.utils.text import capfirst
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Subscription, User)
+
+SHOPPING_LIST_CHUNK_SIZE = 100
+
+
+def get_recipes_limit(request):
+    """
+    Возвращает значение параметра recipes_limit.
+
+    Некорректное или неположительное значение означает отсутствие лимита.
+    """
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return recipes_limit if recipes_limit > 0 else None
+
+
+def prefetch_author_recipes(authors, recipes_limit=None):
+    """
+    Подгружает последние рецепты авторов одним запросом.
+
+    Для каждого рецепта коррелированный подзапрос выбирает id первых
+    recipes_limit рецептов его автора, поэтому из базы выбираются только
+    они. Результат сохраняется в атрибут limited_recipes.
+    """
+    author_ids = [author.pk for author in authors]
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if recipes_limit is not None:
+        recipes = recipes.filter(
+            id__in=Recipe.objects.filter(
+                author_id=OuterRef('author_id')
+            ).order_by('-created_at', '-id').values('id')[:recipes_limit]
+        )
+    prefetch_related_objects(
+        authors,
+        Prefetch(
+            'recipes',
+            queryset=recipes.order_by('-created_at', '-id'),
+            to_attr='limited_recipes'
+        )
+    )
+    return authors
+
+
+def get_recipes_queryset(user):
+    """
+    Рецепты со связанными данными для RecipeReadSerializer.
+
+    Флаги is_favorited и is_in_shopping_cart вычисляются подзапросами
+    EXISTS для пользователя user.
+    """
+    recipes = Recipe.objects.select_related(
+        'author'
+    ).prefetch_related(
+        'tags', 'recipe_ingredients__ingredient'
+    )
+    if not user.is_authenticated:
+        return recipes.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+    return recipes.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+class SubscriptionResolver:
+    """
+    Определяет подписки текущего пользователя в пределах одного ответа.
+
+    Подписки загружаются одним запросом сразу для всех авторов, попавших
+    в сериализуемые объекты, и переиспользуются всеми вложенными
+    сериализаторами пользователей.
+    """
+
+    context_key = 'subscription_resolver'
+
+    def __init__(self, user, instance=None):
+        self.user = user
+        self.author_ids = self._collect_author_ids(instance)
+        self.subscribed_ids = None
+
+    @classmethod
+    def from_serializer(cls, serializer):
+        """Возвращает резолвер, общий для всего дерева сериализаторов."""
+        context = serializer.context
+        resolver = context.get(cls.context_key)
+        if resolver is None:
+            request = context.get('request')
+            resolver = cls(
+                request.user if request else None,
+                serializer.root.instance
+            )
+            context[cls.context_key] = resolver
+        return resolver
+
+    @staticmethod
+    def _collect_author_ids(instance):
+        """Собирает ID пользователей и авторов из объектов ответа."""
+        if instance is None:
+            return set()
+        if not isinstance(instance, (list, tuple, QuerySet)):
+            instance = [instance]
+        author_ids = set()
+        for obj in instance:
+            if isinstance(obj, User):
+                author_ids.add(obj.pk)
+            elif getattr(obj, 'author_id', None) is not None:
+                author_ids.add(obj.author_id)
+        return author_ids
+
+    def is_subscribed(self, author):
+        """Проверяет, подписан ли текущий пользователь на автора."""
+        if self.user is None or not self.user.is_authenticated:
+            return False
+        if self.subscribed_ids is None:
+            self.subscribed_ids = set(
+                Subscription.objects.filter(
+                    user=self.user,
+                    author_id__in=self.author_ids
+                ).values_list('author_id', flat=True)
+            )
+        if author.pk not in self.author_ids:
+            self.author_ids.add(author.pk)
+            if Subscription.objects.filter(
+                user=self.user,
+                author=author
+            ).exists():
+                self.subscribed_ids.add(author.pk)
+        return author.pk in self.subscribed_ids
 
 
-def format_shopping_list(cart_items):
-    """Форматирует список покупок на основе товаров в корзине."""
+def get_shopping_list_products(cart_items):
+    """
+    Возвращает суммарное количество продуктов из корзины.
 
-    ingredients_data = RecipeIngredient.objects.filter(
+    Один запрос с группировкой по ингредиенту, отсортированный по
+    названию. Общее число строк считается оконной функцией в том же
+    запросе (products_count).
+    """
+    return RecipeIngredient.objects.filter(
         recipe__shoppingcart__in=cart_items
     ).values(
-        ingredient_name=F('ingredient__name'),
-        measurement_unit=F('ingredient__measurement_unit')
+        'ingredient_id'
     ).annotate(
-        total_amount=Sum('amount')
-    ).distinct()
-
-    ingredients = {}
-    for item in ingredients_data:
-        key = (item['ingredient_name'], item['measurement_unit'])
-        if key not in ingredients:
-            ingredients[key] = {
-                'name': item['ingredient_name'],
-                'amount': item['total_amount'],
-                'unit': item['measurement_unit'],
-            }
-        else:
-            ingredients[key]['amount'] += item['total_amount']
-
-    products = sorted(ingredients.values(), key=lambda x: x['name'])
-
-    recipes = cart_items.distinct()
-
-    return render_to_string(
-        'shopping_list.txt',
-        {
-            'created_at': timezone.localtime(),
-            'products': products,
-            'recipes': recipes,
-        }
+        name=F('ingredient__name'),
+        unit=F('ingredient__measurement_unit'),
+        total_amount=Sum('amount'),
+        products_count=Window(Count('*')),
+    ).order_by('name', 'unit').iterator()
+
+
+def get_shopping_list_recipes(cart_items):
+    """
+    Возвращает рецепты из корзины с авторами одним запросом.
+
+    Общее число рецептов считается оконной функцией (recipes_count).
+    """
+    return cart_items.values(
+        'recipe_id',
+        name=F('recipe__name'),
+        author=F('recipe__author__username'),
+    ).annotate(
+        recipes_count=Window(Count('*')),
+    ).order_by('id').iterator()
+
+
+def peek_count(rows, count_field):
+    """
+    Возвращает общее число строк из первой строки и сами строки.
+
+    Позволяет вывести количество в заголовке раздела, не загружая
+    все строки в память и не выполняя отдельный COUNT.
+    """
+    first = next(rows, None)
+    if first is None:
+        return 0, iter(())
+    return first[count_field], chain([first], rows)
+
+
+def chunked(lines, size=SHOPPING_LIST_CHUNK_SIZE):
+    """Склеивает строки в блоки по size строк."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def render_shopping_list_txt(created_at, products, recipes):
+    """Построчно формирует список покупок в текстовом виде."""
+    yield f'Список покупок создан: {date_filter(created_at, "d E Y")}\n\n'
+    products_count, products = peek_count(products, 'products_count')
+    yield f'ПРОДУКТЫ ДЛЯ ПРИГОТОВЛЕНИЯ ({products_count} шт.):\n'
+    for number, product in enumerate(products, start=1):
+        yield (
+            f'{number}. {capfirst(product["name"])} - '
+            f'{product["total_amount"]} {product["unit"]}\n'
+        )
+    recipes_count, recipes = peek_count(recipes, 'recipes_count')
+    yield f'\nРЕЦЕПТЫ ДЛЯ ПРИГОТОВЛЕНИЯ ({recipes_count} шт.):\n'
+    for recipe in recipes:
+        yield f'• {recipe["name"]} (автор: @{recipe["author"]})\n'
+
+
+def render_shopping_list_csv(created_at, products, recipes):
+    """
+    Построчно формирует список покупок в формате CSV.
+
+    Как и в остальных форматах, за продуктами следует раздел рецептов:
+    он отделён пустой строкой и начинается со своего заголовка.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = chain(
+        [['Продукт', 'Количество', 'Единица измерения']],
+        (
+            [product['name'], product['total_amount'], product['unit']]
+            for product in products
+        ),
+        [[], ['Рецепт', 'Автор']],
+        ([recipe['name'], recipe['author']] for recipe in recipes),
     )
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def render_shopping_list_json(created_at, products, recipes):
+    """Построчно формирует список покупок в формате JSON."""
+    yield f'{{"created_at": {json.dumps(created_at.isoformat())}, '
+    yield '"products": ['
+    for number, product in enumerate(products):
+        yield ', ' * bool(number) + json.dumps(
+            {
+                'name': product['name'],
+                'amount': product['total_amount'],
+                'measurement_unit': product['unit'],
+            },
+            ensure_ascii=False
+        )
+    yield '], "recipes": ['
+    for number, recipe in enumerate(recipes):
+        yield ', ' * bool(number) + json.dumps(
+            {
+                'id': recipe['recipe_id'],
+                'name': recipe['name'],
+                'author': recipe['author'],
+            },
+            ensure_ascii=False
+        )
+    yield ']}'
+
+
+SHOPPING_LIST_RENDERERS = {
+    'txt': render_shopping_list_txt,
+    'csv': render_shopping_list_csv,
+    'json': render_shopping_list_json,
+}
+
+
+def stream_shopping_list(cart_items, file_format='txt'):
+    """
+    Формирует список покупок потоком блоков строк.
+
+    Строки читаются из базы итератором (два запроса на весь список)
+    и сразу отдаются рендереру выбранного формата, поэтому документ
+    целиком в памяти не хранится.
+    """
+    return chunked(SHOPPING_LIST_RENDERERS[file_format](
+        timezone.localtime(),
+        get_shopping_list_products(cart_items),
+        get_shopping_list_recipes(cart_items),
+    ))
@@ -1,68 +1,132 @@
-from django.http import FileResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.http import parse_etags
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from recipes.counters import (bulk_created, bulk_deleted, delete_rows,
+                              lock_user_relations)
+from recipes.feed import get_feed
+from recipes.images import user_avatars
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
+    RecipeSimilarity,
     ShoppingCart,
+    ShortLink,
     Subscription,
     Tag,
     User,
 )
-
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import LimitPageNumberPagination
+from recipes.pantry import pantry_index
+from recipes.short_links import create_short_links
+
+from .autocomplete import ingredients_autocomplete
+from .cache import ingredients_catalog, recipes_response_cache, tags_catalog
+from .filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from .pagination import (
+    FeedPagination,
+    LimitPageNumberPagination,
+    RecipePagination,
+)
+from .renderers import CSVRenderer, PlainTextRenderer
 from .serializers import (
     AvatarSerializer,
+    IngredientIdsSerializer,
     IngredientSerializer,
+    PantryRecipeSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     ShortRecipeSerializer,
+    SimilarRecipeSerializer,
     RecipeWriteSerializer,
     TagSerializer,
     UsersBaseSerializer,
     UserWithRecipesSerializer,
 )
-from .utils import format_shopping_list
+from .utils import (
+    get_recipes_limit,
+    get_recipes_queryset,
+    prefetch_author_recipes,
+    stream_shopping_list,
+)
+
+
+class ResponseCacheMixin:
+    """
+    Кэширует ответы list и retrieve для анонимных пользователей.
+
+    См. api.cache.ResponseCache.
+    """
 
+    response_cache = None
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.response_cache.make_key(
+            request, self.action, kwargs.get(self.lookup_field)
+        )
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        data = self.response_cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            self.response_cache.set(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class RecipeViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeReadSerializer
     http_method_names = ['get', 'post', 'patch', 'delete']
-    pagination_class = LimitPageNumberPagination
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    pagination_class = RecipePagination
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
+    ordering_fields = ['id', 'name', 'cooking_time', 'created_at', 'trending']
+    ordering = RecipePagination.cursor_pagination_class.ordering
+    response_cache = recipes_response_cache
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        return Recipe.objects.select_related(
-            'author'
-        ).prefetch_related(
-            'tags', 'recipe_ingredients__ingredient'
-        )
+        return get_recipes_queryset(self.request.user)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @transaction.atomic
     def _toggle_relation(self, request, model_class):
         user = request.user
         recipe_id = self.kwargs['pk']
+        lock_user_relations(user)
 
         if request.method == 'DELETE':
             get_object_or_404(
@@ -72,30 +136,122 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ).delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        recipe = get_object_or_404(Recipe, pk=recipe_id)
         _, created = model_class.objects.get_or_create(
             user=user,
-            recipe_id=recipe_id
+            recipe=recipe
         )
         if not created:
             raise ValidationError(
                 {
                     'detail': (
-                        'Рецепт {recipe.name} уже добавлен '
+                        f'Рецепт {recipe.name} уже добавлен '
                         f'в {model_class._meta.verbose_name}.'
                     )
                 }
             )
 
         return Response(
-            ShortRecipeSerializer(
-                get_object_or_404(Recipe, pk=recipe_id)
-            ).data,
+            ShortRecipeSerializer(recipe).data,
             status=status.HTTP_201_CREATED
         )
 
+    def _bulk_toggle_relation(self, request, model_class):
+        """
+        Добавляет или удаляет несколько рецептов за один запрос.
+
+        Рецепты выбираются одним запросом, связи создаются одним
+        bulk_create или удаляются одним DELETE без сигналов; счётчики и
+        баллы популярности затем меняются сгруппированными UPDATE, поэтому
+        число запросов не зависит от количества ID. Счётчики учитывают
+        только строки, которых до вставки не было (повторы пропускает
+        ignore_conflicts); строка пользователя заблокирована, поэтому
+        параллельный запрос не может вставить те же связи между чтением
+        и вставкой. Возвращает результат по каждому ID и краткие
+        данные рецептов.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        with transaction.atomic():
+            lock_user_relations(user)
+            relations = model_class.objects.filter(
+                user=user,
+                recipe_id__in=recipes
+            )
+            if request.method == 'DELETE':
+                deleted = list(relations)
+                delete_rows(
+                    model_class, 'id', [relation.pk for relation in deleted]
+                )
+                bulk_deleted(model_class, deleted)
+                changed, unchanged = 'deleted', 'not_in_list'
+                changed_ids = {relation.recipe_id for relation in deleted}
+            else:
+                existing = set(relations.values_list('recipe_id', flat=True))
+                candidates = model_class.objects.bulk_create(
+                    (
+                        model_class(user=user, recipe_id=recipe_id)
+                        for recipe_id in recipes
+                        if recipe_id not in existing
+                    ),
+                    ignore_conflicts=True
+                )
+                changed_ids = set()
+                if candidates:
+                    changed_ids = set(
+                        relations.values_list('recipe_id', flat=True)
+                    ) - existing
+                bulk_created(model_class, [
+                    relation for relation in candidates
+                    if relation.recipe_id in changed_ids
+                ])
+                changed, unchanged = 'added', 'already_added'
+
+        return Response(
+            {
+                'results': [
+                    {
+                        'id': recipe_id,
+                        'status': (
+                            'not_found' if recipe_id not in recipes
+                            else changed if recipe_id in changed_ids
+                            else unchanged
+                        ),
+                    }
+                    for recipe_id in recipe_ids
+                ],
+                'recipes': ShortRecipeSerializer(
+                    [recipes[pk] for pk in recipe_ids if pk in recipes],
+                    many=True
+                ).data,
+            },
+            status=(
+                status.HTTP_201_CREATED
+                if request.method == 'POST' and changed_ids
+                else status.HTTP_200_OK
+            )
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Удаляет рецепт вместе с избранным и корзинами пользователей.
+
+        Связи удаляются одним DELETE без сигналов: их обработчики меняют
+        только счётчики и балл самого удаляемого рецепта, а при каскадном
+        удалении выполнялись бы по запросу на каждую строку.
+        """
+        for model_class in (Favorite, ShoppingCart):
+            delete_rows(model_class, 'recipe', [instance.pk])
+        instance.delete()
+
     @action(detail=True, methods=['post', 'delete'])
     def favorite(self, request, pk=None):
         return self._toggle_relation(
@@ -110,19 +266,125 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ShoppingCart,
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-bulk'
+    )
+    def favorite_bulk(self, request):
+        return self._bulk_toggle_relation(
+            request,
+            Favorite,
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk'
+    )
+    def shopping_cart_bulk(self, request):
+        return self._bulk_toggle_relation(
+            request,
+            ShoppingCart,
+        )
+
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        url_path='by_ingredients',
+        url_name='by-ingredients'
     )
-    def download_shopping_cart(self, request):
+    def by_ingredients(self, request):
+        """
+        Подбирает рецепты по имеющимся ингредиентам.
+
+        Параметр ingredients — ID ингредиентов (через запятую или
+        несколькими параметрами). Сначала идут рецепты, для которых
+        не хватает меньше всего ингредиентов. Ранжирование выполняет
+        индекс в памяти, из базы читаются только рецепты страницы.
+        """
+        ingredient_ids = request.query_params.getlist('ingredients')
+        if len(ingredient_ids) == 1:
+            ingredient_ids = [
+                ingredient_id
+                for ingredient_id in ingredient_ids[0].split(',')
+                if ingredient_id
+            ]
+        serializer = IngredientIdsSerializer(
+            data={'ingredients': ingredient_ids}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        paginator = LimitPageNumberPagination()
+        page = paginator.paginate_queryset(
+            pantry_index.match(serializer.validated_data['ingredients']),
+            request,
+            view=self
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, matched, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched_count = matched
+                recipe.missing_count = missing
+                results.append(recipe)
+        return paginator.get_paginated_response(
+            PantryRecipeSerializer(
+                results,
+                many=True,
+                context=self.get_serializer_context()
+            ).data
+        )
 
-        return FileResponse(
-            format_shopping_list(request.user.shoppingcart.all()),
-            as_attachment=True,
-            filename='shopping_list.txt',
-            content_type='text/plain'
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Рецепты, которые добавляют в избранное и корзину те же люди.
+
+        Список заранее рассчитывает команда build_similar_recipes;
+        здесь он читается одним запросом по индексу.
+        """
+        similarities = RecipeSimilarity.objects.filter(
+            recipe_id=pk
+        ).select_related('similar').order_by('-score')
+        recipes = []
+        for similarity in similarities:
+            similarity.similar.similarity = similarity.score
+            recipes.append(similarity.similar)
+        if not recipes and not Recipe.objects.filter(pk=pk).exists():
+            raise NotFound(f'Рецепт с id={pk} не найден.')
+        return Response(
+            SimilarRecipeSerializer(
+                recipes,
+                many=True,
+                context=self.get_serializer_context()
+            ).data
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer]
+    )
+    def download_shopping_cart(self, request):
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_shopping_list(
+                request.user.shoppingcart.all(),
+                renderer.format
+            ),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
+        return response
 
     @action(
         detail=True,
@@ -131,23 +393,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get-link'
     )
     def get_link(self, request, pk=None):
-        if not Recipe.objects.filter(pk=pk).exists():
-            raise ValidationError({'detail': f'Рецепт с id={pk} не найден.'})
+        code = ShortLink.objects.filter(
+            recipe_id=pk
+        ).values_list('code', flat=True).first()
+        if code is None:
+            if not Recipe.objects.filter(pk=pk).exists():
+                raise NotFound(f'Рецепт с id={pk} не найден.')
+            code = create_short_links([int(pk)])[int(pk)]
 
         return Response({'short_link': request.build_absolute_uri(
-            reverse('short-link', args=[pk])
+            reverse('short-link', args=[code])
         )})
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogCacheMixin:
+    """
+    Отдаёт полный список справочника из кэша воркера.
+
+    Ответ содержит ETag; при совпадении If-None-Match возвращается 304
+    без обращения к базе данных. Запросы с параметрами (фильтрацией)
+    обрабатываются как обычно.
+    """
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        etag = self.catalog.get_etag()
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+
+        entry = self.catalog.get()
+        return Response(entry.data, headers={'ETag': entry.etag})
+
+
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
     http_method_names = ['get']
     pagination_class = None
+    catalog = tags_catalog
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
@@ -155,6 +452,13 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     http_method_names = ['get']
     pagination_class = None
+    catalog = ingredients_catalog
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredients_autocomplete.search(name))
 
 
 class UserViewSet(DjoserUserViewSet):
@@ -172,6 +476,8 @@ class UserViewSet(DjoserUserViewSet):
     )
     def avatar(self, request):
         if request.method == 'DELETE':
+            if request.user.avatar:
+                user_avatars.delete_variants(request.user.avatar.name)
             request.user.avatar.delete(save=False)
             request.user.avatar = None
             request.user.save(update_fields=['avatar'])
@@ -219,7 +525,10 @@ class UserViewSet(DjoserUserViewSet):
 
         return Response(
             UserWithRecipesSerializer(
-                author,
+                prefetch_author_recipes(
+                    [author],
+                    get_recipes_limit(request)
+                )[0],
                 context={'request': request}
             ).data,
             status=status.HTTP_201_CREATED
@@ -231,12 +540,46 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-
+        authors = self.paginate_queryset(
+            User.objects.filter(author_subscriptions__user=request.user)
+        )
         return self.get_paginated_response(
             UserWithRecipesSerializer(
-                [s.author for s in self.paginate_queryset(
-                    request.user.subscriptions.all())],
+                prefetch_author_recipes(authors, get_recipes_limit(request)),
                 many=True,
                 context={'request': request}
             ).data
         )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscriptions/feed',
+        url_name='subscriptions-feed'
+    )
+    def subscriptions_feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+
+        Позиции страницы берутся из предрассчитанной ленты (см.
+        recipes.feed), рецепты загружаются одним запросом по id.
+        """
+        paginator = FeedPagination()
+        page = paginator.paginate(
+            lambda before, limit: get_feed(request.user, limit, before),
+            request
+        )
+        recipes = get_recipes_queryset(request.user).in_bulk(
+            [recipe_id for _, recipe_id in page]
+        )
+        return paginator.get_paginated_response(
+            RecipeReadSerializer(
+                [
+                    recipes[recipe_id] for _, recipe_id in page
+                    if recipe_id in recipes
+                ],
+                many=True,
+                context=self.get_serializer_context()
+            ).data
+        )
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,6 +42,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION') == 'True'
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -82,6 +85,40 @@ else:
         }
     }
 
+# Кэш должен быть общим для всех процессов и контейнеров (см.
+# recipes.checks); по умолчанию файловый — только для разработки.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram_cache'),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = (
+    int(os.getenv('INGREDIENTS_AUTOCOMPLETE_LIMIT', 0)) or None
+)
+
+SHORT_LINK_LRU_SIZE = int(os.getenv('SHORT_LINK_LRU_SIZE', 10000))
+SHORT_LINK_CACHE_TIMEOUT = int(os.getenv('SHORT_LINK_CACHE_TIMEOUT', 86400))
+SHORT_LINK_LOCAL_TIMEOUT = int(os.getenv('SHORT_LINK_LOCAL_TIMEOUT', 60))
+SHORT_LINK_MISSING_TIMEOUT = int(os.getenv('SHORT_LINK_MISSING_TIMEOUT', 60))
+
+PANTRY_MAX_REPLAY = int(os.getenv('PANTRY_MAX_REPLAY', 1000))
+PANTRY_CHANGE_TIMEOUT = int(os.getenv('PANTRY_CHANGE_TIMEOUT', 86400))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 1000))
+FEED_BATCH_SIZE = int(os.getenv('FEED_BATCH_SIZE', 1000))
+
+TRENDING_HALF_LIFE = int(os.getenv('TRENDING_HALF_LIFE', 3 * 24 * 60 * 60))
+
+SIMILAR_RECIPES_LIMIT = int(os.getenv('SIMILAR_RECIPES_LIMIT', 10))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,6 +151,17 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', 20 * 1024 * 1024)
+)
+IMAGE_MAX_ATTEMPTS = int(os.getenv('IMAGE_MAX_ATTEMPTS', 3))
+IMAGE_FAILURE_TIMEOUT = int(os.getenv('IMAGE_FAILURE_TIMEOUT', 86400))
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
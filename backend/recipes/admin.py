@@ -2,12 +2,14 @@ from django.contrib import admin
 from django.contrib.admin.sites import NotRegistered
 from django.contrib.auth.models import Group
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, Prefetch
 from django.utils.safestring import mark_safe
 
+from .counters import change_counter
 from .filters import (CookingTimeFilter, HasInRecipesFilter, HasRecipesFilter,
                       HasSubscribersFilter, HasSubscriptionsFilter)
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Subscription, Tag, User)
+                     ShoppingCart, ShortLink, Subscription, Tag, User)
 
 
 try:
@@ -17,11 +19,18 @@ except NotRegistered:
 
 
 class RecipesCountMixin:
+    """Колонка с количеством рецептов, посчитанным в запросе списка."""
+
     list_display = ['recipes_count']
 
-    @admin.display(description='Рецептов')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count('recipes', distinct=True)
+        )
+
+    @admin.display(description='Рецептов', ordering='recipes_count')
     def recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 @admin.register(Tag)
@@ -50,13 +59,17 @@ class RecipeAdmin(admin.ModelAdmin):
 
     list_display = [
         'id', 'name', 'author', 'cooking_time',
-        'display_image', 'display_products', 'display_tags', 'favorites_count'
+        'display_image', 'display_products', 'display_tags',
+        'favorites_count', 'shopping_carts_count'
     ]
     list_filter = ['author', 'tags', CookingTimeFilter]
+    list_select_related = ['author']
     search_fields = ['name', 'author__username', 'tags__name',
                      'ingredients__name']
     ordering = ['name']
-    readonly_fields = ['display_image', 'favorites_count']
+    readonly_fields = [
+        'display_image', 'favorites_count', 'shopping_carts_count'
+    ]
     filter_horizontal = ['tags']
     inlines = []
     fieldsets = (
@@ -71,11 +84,34 @@ class RecipeAdmin(admin.ModelAdmin):
                     'tags',
                     ('image', 'display_image'),
                     'favorites_count',
+                    'shopping_carts_count',
                 )
             },
         ),
     )
 
+    def save_model(self, request, obj, form, change):
+        """
+        Сохраняет рецепт и переносит его в счётчике при смене автора.
+
+        Сигнал счётчика срабатывает только при создании рецепта.
+        """
+        super().save_model(request, obj, form, change)
+        if change and 'author' in form.changed_data:
+            change_counter(
+                User, form.initial['author'], 'recipes_count', -1
+            )
+            change_counter(User, obj.author_id, 'recipes_count', 1)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
     @admin.display(description='Картинка')
     def display_image(self, recipe):
         """Показать картинку рецепта."""
@@ -95,9 +131,7 @@ class RecipeAdmin(admin.ModelAdmin):
                     f'{item.ingredient.name} '
                     f'({item.amount} {item.ingredient.measurement_unit})'
                 )
-                for item in recipe.recipe_ingredients.select_related(
-                    'ingredient'
-                ).all()
+                for item in recipe.recipe_ingredients.all()
             )
         )
 
@@ -106,11 +140,6 @@ class RecipeAdmin(admin.ModelAdmin):
         """Показать список тегов."""
         return mark_safe('<br>'.join(tag.name for tag in obj.tags.all()))
 
-    @admin.display(description='В избранном')
-    def favorites_count(self, recipe):
-        """Количество добавлений рецепта в избранное."""
-        return recipe.favorite.count()
-
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
@@ -126,6 +155,7 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     """Страничка управления рецептами связанными с продуктами в админке."""
 
     list_display = ['id', 'recipe', 'ingredient', 'amount']
+    list_select_related = ['recipe', 'ingredient']
     search_fields = ['recipe__name', 'ingredient__name']
     ordering = ['recipe']
 
@@ -134,6 +164,7 @@ class UserRecipeBaseAdmin(admin.ModelAdmin):
     """Базовый класс для избранного и списка покупок."""
 
     list_display = ['id', 'user', 'recipe']
+    list_select_related = ['user', 'recipe']
     search_fields = ['user__username', 'recipe__name']
     ordering = ['user']
 
@@ -148,20 +179,30 @@ class ShoppingCartAdmin(UserRecipeBaseAdmin):
     """Страничка управления списком покупок в админке."""
 
 
+@admin.register(ShortLink)
+class ShortLinkAdmin(admin.ModelAdmin):
+    """Страничка управления короткими ссылками в админке."""
+
+    list_display = ['id', 'code', 'recipe']
+    list_select_related = ['recipe']
+    search_fields = ['code', 'recipe__name']
+
+
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     """Страничка управления подписками в админке."""
 
     list_display = ['id', 'user', 'author']
+    list_select_related = ['user', 'author']
     search_fields = ['user__username', 'author__username']
     ordering = ['user']
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin, RecipesCountMixin):
+class UserAdmin(BaseUserAdmin):
     """Страничка управления пользователями в админке."""
 
-    list_display = [*RecipesCountMixin.list_display, 'id',
+    list_display = ['recipes_count', 'id',
                     'username', 'full_name',
                     'email', 'display_avatar',
                     'subscriptions_count',
@@ -191,6 +232,16 @@ class UserAdmin(BaseUserAdmin, RecipesCountMixin):
             },
         ),
         ('Важные даты', {'fields': ('last_login', 'date_joined')}),
+        (
+            'Статистика',
+            {
+                'fields': (
+                    'recipes_count',
+                    'subscriptions_count',
+                    'subscribers_count',
+                )
+            },
+        ),
     )
     add_fieldsets = (
         (
@@ -208,7 +259,10 @@ class UserAdmin(BaseUserAdmin, RecipesCountMixin):
     )
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('username',)
-    readonly_fields = ['display_avatar']
+    readonly_fields = [
+        'display_avatar', 'recipes_count', 'subscriptions_count',
+        'subscribers_count'
+    ]
 
     @admin.display(description='ФИО')
     def full_name(self, user):
@@ -224,13 +278,3 @@ class UserAdmin(BaseUserAdmin, RecipesCountMixin):
                 'style="border-radius: 50%; object-fit: cover;" />'
             )
         return '-'
-
-    @admin.display(description='Подписок')
-    def subscriptions_count(self, user):
-        """Количество подписок пользователя."""
-        return user.subscriptions.count()
-
-    @admin.display(description='Подписчиков')
-    def subscribers_count(self, user):
-        """Количество подписчиков пользователя."""
-        return user.author_subscriptions.count()
@@ -0,0 +1,78 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+VERSION_KEY = 'version:{label}'
+
+
+def _version_key(model):
+    return VERSION_KEY.format(label=model._meta.label_lower)
+
+
+def get_version(model):
+    """
+    Возвращает текущую версию данных модели.
+
+    Версия хранится в общем кэше, поэтому изменения, сделанные в одном
+    процессе (воркер, management-команда), видны всем остальным.
+    Начальное значение берётся из текущего времени, чтобы версия после
+    вытеснения ключа не совпала с уже выданной ранее.
+    """
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*models):
+    """Возвращает версии данных нескольких моделей одним обращением к кэшу."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    return tuple(
+        versions[key] if key in versions else get_version(model)
+        for key, model in zip(keys, models)
+    )
+
+
+def bump_version(model):
+    """Увеличивает версию данных модели."""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    else:
+        cache.touch(key, timeout=None)
+
+
+def bump_version_on_commit(model):
+    """Увеличивает версию данных модели после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def _flush_pending(attribute, callback):
+    items = getattr(connection, attribute, None)
+    setattr(connection, attribute, set())
+    if items:
+        callback(items)
+
+
+def collect_on_commit(name, items, callback):
+    """
+    Передаёт callback все items, накопленные до фиксации транзакции.
+
+    Элементы копятся в общем для соединения множестве name, и первый же
+    обработчик транзакции забирает их все; остальные обработчики той же
+    транзакции ничего не делают. Элементы откаченной транзакции уйдут
+    вместе со следующими, поэтому callback должен быть идемпотентным.
+    """
+    attribute = f'pending_{name}'
+    pending = getattr(connection, attribute, None)
+    if pending is None:
+        pending = set()
+        setattr(connection, attribute, pending)
+    pending.update(items)
+    transaction.on_commit(lambda: _flush_pending(attribute, callback))
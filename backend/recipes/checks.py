@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Проверяет, что без DEBUG используется кэш, общий для всех процессов.
+
+    В кэше хранятся версии данных (recipes.cache), журнал подбора по
+    ингредиентам и попытки обработки изображений. С кэшем в памяти
+    процесса или на диске контейнера изменения из одного процесса
+    не видны в других, и ответы API устаревают.
+    """
+    if settings.DEBUG:
+        return []
+    errors = []
+    for alias in sorted({'default', settings.RESPONSE_CACHE_ALIAS}):
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_CACHES:
+            errors.append(Error(
+                f'Кэш {alias!r} ({backend}) не общий для процессов и '
+                f'контейнеров.',
+                hint=(
+                    'Укажите CACHE_BACKEND=django.core.cache.backends.'
+                    'memcached.PyMemcacheCache и CACHE_LOCATION '
+                    '(адрес memcached).'
+                ),
+                id='recipes.E001',
+            ))
+    return errors
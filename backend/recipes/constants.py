@@ -1,2 +1,6 @@
 MIN_AMOUNT = 1
 MIN_COOKING_TIME = 1
+MAX_BULK_RECIPES = 100
+SHORT_LINK_MAX_LENGTH = 10
+SHORT_LINK_CODE_LENGTH = 6
+MAX_PANTRY_INGREDIENTS = 50
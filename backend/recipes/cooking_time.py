@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import get_version
+from .models import Recipe
+
+CookingTimeBucket = namedtuple(
+    'CookingTimeBucket', ['slug', 'min_time', 'max_time', 'count']
+)
+
+BUCKETS_KEY = 'cooking_time_buckets:{version}'
+
+
+def calculate_cooking_time_buckets():
+    """
+    Делит рецепты на быстрые, средние и долгие по времени готовки.
+
+    Пороги — границы терцилей различных значений времени готовки.
+    Гистограмма (время, число рецептов) выбирается одним запросом
+    с группировкой, пороги и размеры групп считаются по ней.
+    """
+    histogram = list(
+        Recipe.objects.order_by('cooking_time').values_list(
+            'cooking_time'
+        ).annotate(count=Count('id'))
+    )
+    if len(histogram) < 3:
+        return ()
+
+    times = [time for time, _ in histogram]
+    fast_threshold = times[len(times) // 3]
+    medium_threshold = times[2 * len(times) // 3]
+    ranges = (
+        ('fast', times[0], fast_threshold),
+        ('medium', fast_threshold + 1, medium_threshold),
+        ('slow', medium_threshold + 1, times[-1]),
+    )
+    return tuple(
+        CookingTimeBucket(
+            slug,
+            min_time,
+            max_time,
+            sum(
+                count for time, count in histogram
+                if min_time <= time <= max_time
+            ),
+        )
+        for slug, min_time, max_time in ranges
+    )
+
+
+def get_cooking_time_buckets():
+    """
+    Возвращает группы времени готовки из кэша.
+
+    Ключ кэша содержит версию данных рецептов, поэтому любое изменение
+    рецептов приводит к пересчёту.
+    """
+    key = BUCKETS_KEY.format(version=get_version(Recipe))
+    buckets = cache.get(key)
+    if buckets is None:
+        buckets = calculate_cooking_time_buckets()
+        cache.set(key, buckets)
+    return buckets
+
+
+def get_cooking_time_range(slug):
+    """Возвращает диапазон (min, max) группы или None."""
+    for bucket in get_cooking_time_buckets():
+        if bucket.slug == slug:
+            return bucket.min_time, bucket.max_time
+    return None
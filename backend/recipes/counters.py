@@ -0,0 +1,167 @@
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe, ShoppingCart, Subscription, User
+from .trending import TRENDING_WEIGHTS, change_trending
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscriptions_count', Subscription, 'user'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарно изменяет счётчик объекта на delta.
+
+    Значение не опускается ниже нуля, даже если счётчик уже расходится
+    с фактическими данными (это исправляет reconcile_counters).
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def change_counters(model, pks, field, delta):
+    """Атомарно изменяет счётчик сразу у нескольких объектов."""
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def _relations_changed(related_model, instances, sign):
+    for model, field, counted_model, related_field in COUNTERS:
+        if counted_model is not related_model:
+            continue
+        deltas = defaultdict(list)
+        for pk, delta in Counter(
+            getattr(instance, f'{related_field}_id')
+            for instance in instances
+        ).items():
+            deltas[sign * delta].append(pk)
+        for delta, pks in deltas.items():
+            change_counters(model, pks, field, delta)
+    if related_model in TRENDING_WEIGHTS:
+        change_trending(
+            related_model,
+            [(instance.recipe_id, instance.created_at)
+             for instance in instances],
+            sign
+        )
+
+
+def bulk_created(related_model, instances):
+    """
+    Обновляет счётчики после bulk_create, который не отправляет сигналы.
+
+    Выполняет по одному UPDATE на каждый счётчик, зависящий от
+    related_model, и на каждое значение прироста. Баллы популярности
+    рецептов обновляются так же.
+    """
+    _relations_changed(related_model, instances, 1)
+
+
+def bulk_deleted(related_model, instances):
+    """
+    Обновляет счётчики после удаления строк без сигналов (delete_rows).
+
+    instances — удалённые объекты; запросов столько же, сколько
+    у bulk_created.
+    """
+    _relations_changed(related_model, instances, -1)
+
+
+def delete_rows(model, field, values):
+    """
+    Удаляет строки model, у которых field входит в values, одним DELETE.
+
+    В отличие от QuerySet.delete() не отправляет сигналы и не собирает
+    каскад, поэтому подходит только для связей без зависимых объектов;
+    счётчики вызывающий код обновляет сам (bulk_deleted).
+    """
+    values = list(values)
+    if not values:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(model._meta.get_field(field).column)} '
+            f'IN ({placeholders})',
+            values
+        )
+
+
+def lock_user_relations(user):
+    """
+    Блокирует строку пользователя до конца транзакции.
+
+    Избранное и корзина одного пользователя меняются по очереди:
+    параллельные запросы не учтут одну и ту же связь в счётчиках дважды.
+    """
+    User.objects.select_for_update().get(pk=user.pk)
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос, считающий связанные объекты для OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                count=Count('*')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def _pk_batches(queryset, batch_size):
+    """
+    Делит queryset на диапазоны первичного ключа по batch_size строк.
+
+    Границы выбираются по ключу (keyset): в памяти одновременно не больше
+    batch_size значений pk.
+    """
+    last = None
+    while True:
+        page = queryset.order_by('pk')
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        last = pks[-1]
+        yield queryset.filter(pk__gte=pks[0], pk__lte=last)
+
+
+def reconcile_counter(model, field, related_model, related_field,
+                      batch_size=None):
+    """
+    Исправляет расхождения счётчика с фактическим числом связей.
+
+    Обновляет только строки с неверным значением, пакетами по диапазонам
+    первичного ключа. Возвращает количество исправленных строк.
+    """
+    objects = model.objects.order_by()
+    batches = (
+        [objects] if batch_size is None
+        else _pk_batches(objects, batch_size)
+    )
+    fixed = 0
+    for batch in batches:
+        actual = actual_count(related_model, related_field)
+        with transaction.atomic():
+            fixed += batch.order_by().exclude(**{field: actual}).update(
+                **{field: actual}
+            )
+    return fixed
@@ -0,0 +1,198 @@
+from heapq import merge
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import FeedEntry, Recipe, Subscription, User
+
+
+def fans_out(author_id):
+    """
+    Проверяет, рассылаются ли рецепты автора по лентам подписчиков.
+
+    Рецепты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, в
+    таблицу лент не копируются: get_feed читает их из рецептов.
+    """
+    return User.objects.filter(
+        pk=author_id,
+        subscribers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def _create_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_recipe(recipe_id):
+    """Добавляет рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values_list(
+        'author_id', 'created_at'
+    ).first()
+    if recipe is None:
+        return
+    author_id, created_at = recipe
+    if not fans_out(author_id):
+        return
+    _create_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, created_at=created_at)
+        for user_id in Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+    )
+
+
+def fan_out_recipe_on_commit(recipe_id):
+    """
+    Рассылает новый рецепт после фиксации транзакции.
+
+    Запрос публикации не ждёт вставки до FEED_FANOUT_LIMIT строк и не
+    держит на это время блокировки; рецепт, удалённый до фиксации,
+    не рассылается.
+    """
+    transaction.on_commit(lambda: fan_out_recipe(recipe_id))
+
+
+def backfill_subscription(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные рецепты автора."""
+    if not Subscription.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists() or not fans_out(author_id):
+        return
+    _create_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, created_at=created_at)
+        for recipe_id, created_at in Recipe.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'created_at').iterator()
+    )
+
+
+def backfill_author(author_id):
+    """
+    Добавляет рецепты автора в ленты всех его подписчиков.
+
+    Нужна, когда число подписчиков опустилось до FEED_FANOUT_LIMIT:
+    рецепты, опубликованные сверх лимита, в ленты не копировались,
+    а читать их из рецептов get_feed перестаёт. Уже имеющиеся записи
+    пропускаются.
+    """
+    if not fans_out(author_id):
+        return
+    author_recipes = list(Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'created_at'))
+    _create_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, created_at=created_at)
+        for user_id in Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+        for recipe_id, created_at in author_recipes
+    )
+
+
+def subscription_changed(user_id, author_id, subscribers_count, added):
+    """
+    Приводит ленту в соответствие с новой или удалённой подпиской.
+
+    subscribers_count — число подписчиков автора после изменения.
+    Дополнение лент выполняется после фиксации транзакции; при отписке,
+    опустившей число подписчиков до лимита, ленты остальных подписчиков
+    дополняются рецептами автора (backfill_author).
+    """
+    if added:
+        if subscribers_count <= settings.FEED_FANOUT_LIMIT:
+            transaction.on_commit(
+                lambda: backfill_subscription(user_id, author_id)
+            )
+        return
+    prune_subscription(user_id, author_id)
+    if subscribers_count == settings.FEED_FANOUT_LIMIT:
+        transaction.on_commit(lambda: backfill_author(author_id))
+
+
+def prune_subscription(user_id, author_id):
+    """Удаляет рецепты автора из ленты бывшего подписчика."""
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        recipe__in=Recipe.objects.filter(author_id=author_id)
+    ).delete()
+
+
+def rebuild_feeds():
+    """
+    Заполняет таблицу лент заново по текущим подпискам.
+
+    Нужна после изменения FEED_FANOUT_LIMIT или если рассылка после
+    фиксации не выполнилась (например, процесс был остановлен).
+    Возвращает количество записей.
+    """
+    FeedEntry.objects.all().delete()
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('user_id', 'author_id').order_by('author_id')
+    for author_id, rows in groupby(subscriptions.iterator(), itemgetter(1)):
+        author_recipes = list(Recipe.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'created_at'))
+        _create_entries(
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, created_at=created_at
+            )
+            for user_id, _ in rows
+            for recipe_id, created_at in author_recipes
+        )
+    return FeedEntry.objects.count()
+
+
+def _before(position, date_field, id_field):
+    """Условие keyset: строки строго после позиции (дата, id) в ленте."""
+    created_at, recipe_id = position
+    return Q(**{f'{date_field}__lt': created_at}) | Q(**{
+        date_field: created_at, f'{id_field}__lt': recipe_id
+    })
+
+
+def get_feed(user, limit, before=None):
+    """
+    Возвращает до limit позиций ленты (дата создания, id рецепта).
+
+    Позиции упорядочены от новых к старым и начинаются после before.
+    Записи таблицы лент сливаются с рецептами авторов, рассылка которых
+    отключена лимитом (fan-out on read); каждый источник читается по
+    индексу не более чем на limit строк. Рецепт, попавший в оба
+    источника (автор превысил лимит после публикации), возвращается один
+    раз: его позиции совпадают и идут подряд.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    recipes = Recipe.objects.filter(
+        author__in=User.objects.filter(
+            author_subscriptions__user=user,
+            subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+        )
+    )
+    if before is not None:
+        entries = entries.filter(_before(before, 'created_at', 'recipe_id'))
+        recipes = recipes.filter(_before(before, 'created_at', 'id'))
+    positions = merge(
+        entries.order_by('-created_at', '-recipe_id').values_list(
+            'created_at', 'recipe_id'
+        )[:limit],
+        recipes.order_by('-created_at', '-id').values_list(
+            'created_at', 'id'
+        )[:limit],
+        reverse=True
+    )
+    feed = []
+    for position in positions:
+        if feed and feed[-1] == position:
+            continue
+        feed.append(position)
+        if len(feed) == limit:
+            break
+    return feed
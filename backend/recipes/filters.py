@@ -1,60 +1,50 @@
 from django.contrib import admin
 
-from .models import Recipe
+from .cooking_time import get_cooking_time_buckets, get_cooking_time_range
 
 
 class CookingTimeFilter(admin.SimpleListFilter):
+    """
+    Фильтр по времени готовки: быстрые, средние и долгие рецепты.
+
+    Пороги и количество рецептов берутся из кэшируемого сервиса
+    recipes.cooking_time.
+    """
+
     title = 'Время готовки'
     parameter_name = 'cooking_time_range'
-    ranges = {}
 
     def lookups(self, request, model_admin):
-        times = list(
-            Recipe.objects.order_by(
-                'cooking_time'
-            ).values_list('cooking_time', flat=True).distinct()
-        )
-        if len(times) < 3:
-            return ()
-
-        fast_threshold = times[len(times) // 3]
-        medium_threshold = times[2 * len(times) // 3]
-
-        self.ranges = {
-            'fast': (times[0], fast_threshold),
-            'medium': (fast_threshold + 1, medium_threshold),
-            'slow': (medium_threshold + 1, times[-1]),
+        buckets = {
+            bucket.slug: bucket for bucket in get_cooking_time_buckets()
         }
-        fast_count = Recipe.objects.filter(
-            cooking_time__range=self.ranges['fast']
-        ).count()
-        medium_count = Recipe.objects.filter(
-            cooking_time__range=self.ranges['medium']
-        ).count()
-        slow_count = Recipe.objects.filter(
-            cooking_time__range=self.ranges['slow']
-        ).count()
+        if not buckets:
+            return ()
 
+        fast = buckets['fast']
+        medium = buckets['medium']
+        slow = buckets['slow']
         return (
             (
                 'fast',
-                f'Быстрее {fast_threshold} мин ({fast_count})'
+                f'Быстрее {fast.max_time} мин ({fast.count})'
             ),
             (
                 'medium',
-                f'{fast_threshold}-{medium_threshold} мин ({medium_count})'
+                f'{fast.max_time}-{medium.max_time} мин ({medium.count})'
             ),
             (
                 'slow',
-                f'Дольше {medium_threshold} мин ({slow_count})'
+                f'Дольше {medium.max_time} мин ({slow.count})'
             ),
         )
 
     def queryset(self, request, recipes):
-        if self.value() not in self.ranges:
+        cooking_time_range = get_cooking_time_range(self.value())
+        if cooking_time_range is None:
             return recipes
 
-        return recipes.filter(cooking_time__range=self.ranges[self.value()])
+        return recipes.filter(cooking_time__range=cooking_time_range)
 
 
 class BaseHasRelatedFilter(admin.SimpleListFilter):
@@ -0,0 +1,232 @@
+import io
+import posixpath
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from PIL import Image, ImageOps
+
+from .cache import bump_version
+from .models import Recipe, User
+
+ImageVariant = namedtuple('ImageVariant', ['name', 'size', 'crop'])
+
+RECIPE_IMAGE_VARIANTS = (
+    ImageVariant('thumbnail', (160, 120), crop=True),
+    ImageVariant('card', (480, 360), crop=True),
+    ImageVariant('full', (1280, 960), crop=False),
+)
+AVATAR_VARIANTS = (
+    ImageVariant('thumbnail', (64, 64), crop=True),
+    ImageVariant('card', (160, 160), crop=True),
+    ImageVariant('full', (512, 512), crop=False),
+)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+FAILURES_KEY = 'image_failures:{model}:{field}'
+
+
+def _prepare(image):
+    """Поворачивает изображение по EXIF и убирает прозрачность."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(data, variants):
+    """
+    Строит варианты изображения во всех форматах.
+
+    Функция не обращается к БД и хранилищу, поэтому её можно выполнять
+    в отдельном процессе. Возвращает словарь {(вариант, формат): байты}.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        source = _prepare(original)
+    rendered = {}
+    for variant in variants:
+        if variant.crop:
+            image = ImageOps.fit(source, variant.size, Image.LANCZOS)
+        else:
+            image = source.copy()
+            image.thumbnail(variant.size, Image.LANCZOS)
+        for extension, (image_format, options) in IMAGE_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            rendered[variant.name, extension] = buffer.getvalue()
+    return rendered
+
+
+class ImagePipeline:
+    """
+    Варианты изображений одного поля модели.
+
+    Варианты лежат рядом с оригиналом по пути, который однозначно
+    выводится из его имени, поэтому для URL не нужны дополнительные
+    запросы. Готовность вариантов отмечается в поле processed_field:
+    оно совпадает с именем файла, для которого варианты построены.
+    """
+
+    def __init__(self, model, field, processed_field, variants):
+        self.model = model
+        self.field = field
+        self.processed_field = processed_field
+        self.variants = variants
+
+    @property
+    def storage(self):
+        return self.model._meta.get_field(self.field).storage
+
+    def variant_name(self, name, variant, extension):
+        """Возвращает имя файла варианта изображения."""
+        directory, filename = posixpath.split(name)
+        stem = posixpath.splitext(filename)[0]
+        return posixpath.join(
+            directory, VARIANTS_DIR, stem, f'{variant}.{extension}'
+        )
+
+    def is_ready(self, instance):
+        """Проверяет, построены ли варианты для текущего изображения."""
+        name = getattr(instance, self.field).name
+        return bool(name) and getattr(instance, self.processed_field) == name
+
+    def get_urls(self, instance, request=None):
+        """
+        Возвращает URL вариантов изображения или None, если их ещё нет.
+
+        Пример: {'card': {'webp': '...', 'jpeg': '...'}, ...}.
+        """
+        if not self.is_ready(instance):
+            return None
+        name = getattr(instance, self.field).name
+        urls = {}
+        for variant in self.variants:
+            urls[variant.name] = {}
+            for extension in IMAGE_FORMATS:
+                url = self.storage.url(
+                    self.variant_name(name, variant.name, extension)
+                )
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant.name][extension] = url
+        return urls
+
+    @property
+    def failures_key(self):
+        return FAILURES_KEY.format(
+            model=self.model._meta.label_lower, field=self.field
+        )
+
+    def get_failures(self):
+        """Возвращает неудачные попытки {pk: (имя файла, попыток)}."""
+        return cache.get(self.failures_key, {})
+
+    def record_failure(self, pk, name):
+        """
+        Запоминает неудачную попытку построить варианты изображения.
+
+        Счёт ведётся для конкретного файла: после замены изображения
+        попытки начинаются заново. Записи хранятся в общем кэше
+        IMAGE_FAILURE_TIMEOUT секунд, после чего изображение снова
+        попадает в pending(). Возвращает число попыток.
+        """
+        failures = self.get_failures()
+        failed_name, attempts = failures.get(pk, (name, 0))
+        attempts = attempts + 1 if failed_name == name else 1
+        failures[pk] = (name, attempts)
+        cache.set(
+            self.failures_key, failures, settings.IMAGE_FAILURE_TIMEOUT
+        )
+        return attempts
+
+    def pending(self):
+        """
+        Возвращает объекты, для изображений которых нет вариантов.
+
+        Изображения, которые не удалось обработать IMAGE_MAX_ATTEMPTS раз
+        (см. record_failure), пропускаются.
+        """
+        pending = self.model.objects.exclude(
+            **{self.field: ''}
+        ).exclude(
+            **{self.field: None}
+        ).exclude(
+            **{self.processed_field: F(self.field)}
+        )
+        abandoned = [
+            Q(pk=pk, **{self.field: name})
+            for pk, (name, attempts) in self.get_failures().items()
+            if attempts >= settings.IMAGE_MAX_ATTEMPTS
+        ]
+        if abandoned:
+            pending = pending.exclude(reduce(or_, abandoned))
+        return pending.order_by('pk')
+
+    def read(self, name):
+        """Читает оригинал изображения из хранилища."""
+        with self.storage.open(name, 'rb') as file:
+            return file.read()
+
+    def save(self, pk, name, rendered):
+        """
+        Сохраняет варианты и отмечает изображение обработанным.
+
+        Отметка ставится, только если изображение не заменили и объект
+        не удалили, пока строились варианты; иначе записанные варианты
+        сразу удаляются. Возвращает True, если отметка поставлена.
+        """
+        for (variant, extension), content in rendered.items():
+            variant_name = self.variant_name(name, variant, extension)
+            if self.storage.exists(variant_name):
+                self.storage.delete(variant_name)
+            self.storage.save(variant_name, ContentFile(content))
+        marked = bool(
+            self.model.objects.filter(
+                pk=pk, **{self.field: name}
+            ).update(**{self.processed_field: name})
+        )
+        if not marked:
+            self.delete_variants(name)
+        return marked
+
+    def delete_variants(self, name):
+        """Удаляет варианты изображения из хранилища."""
+        for variant in self.variants:
+            for extension in IMAGE_FORMATS:
+                self.storage.delete(
+                    self.variant_name(name, variant.name, extension)
+                )
+
+    def delete_variants_on_commit(self, name):
+        """
+        Удаляет варианты заменённого или удалённого изображения.
+
+        Файлы удаляются после фиксации транзакции: при откате изображение
+        остаётся прежним, и его варианты нужны.
+        """
+        if name:
+            transaction.on_commit(lambda: self.delete_variants(name))
+
+    def invalidate(self):
+        """Сбрасывает кэш ответов, в которых выводятся URL вариантов."""
+        bump_version(self.model)
+
+
+recipe_images = ImagePipeline(
+    Recipe, 'image', 'image_processed', RECIPE_IMAGE_VARIANTS
+)
+user_avatars = ImagePipeline(
+    User, 'avatar', 'avatar_processed', AVATAR_VARIANTS
+)
+IMAGE_PIPELINES = (recipe_images, user_avatars)
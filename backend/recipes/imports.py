@@ -0,0 +1,356 @@
+import csv
+import io
+import json
+import os
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connection, transaction
+
+JSON_CHUNK_SIZE = 64 * 1024
+FORMATS_BY_EXTENSION = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+
+class ImportFormatError(ValueError):
+    """Файл импорта не удаётся разобрать."""
+
+
+class ImportConflictError(ValueError):
+    """Запись нарушает уникальность поля другого объекта."""
+
+
+class JsonArrayReader:
+    """
+    Читает элементы JSON-массива по одному.
+
+    Файл читается блоками по chunk_size символов; в памяти находится
+    только текущий блок и разбираемый элемент, а не весь документ.
+    """
+
+    def __init__(self, file, chunk_size=JSON_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _read(self):
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def _peek(self):
+        """Возвращает следующий непробельный символ или '' в конце файла."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position].isspace()
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ''
+            self._read()
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ImportFormatError(
+                f'ожидался один из символов {chars!r}, найдено {char!r}'
+            )
+        self.position += 1
+        return char
+
+    def _decode(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise ImportFormatError(str(error)) from error
+                self._read()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # Число на границе блока могло прочитаться не полностью.
+                self._read()
+                continue
+            self.position = end
+            return value
+
+    def __iter__(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.position += 1
+        else:
+            while True:
+                yield self._decode()
+                if self._expect(',]') == ']':
+                    break
+        if self._peek():
+            raise ImportFormatError('лишние данные после массива')
+
+
+def iter_ndjson(file):
+    """Читает по одному JSON-объекту из каждой непустой строки."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ImportFormatError(f'строка {number}: {error}') from error
+
+
+def iter_csv(file, fields):
+    """
+    Читает строки CSV как словари с ключами fields.
+
+    Заголовок необязателен: первая строка, совпадающая с fields,
+    пропускается. Строка с другим числом столбцов возвращается списком
+    и считается некорректной.
+    """
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if reader.line_num == 1 and [
+            column.strip() for column in row
+        ] == list(fields):
+            continue
+        yield dict(zip(fields, row)) if len(row) == len(fields) else row
+
+
+def get_format(path):
+    """Определяет формат файла по расширению (None, если неизвестен)."""
+    return FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+
+
+def read_items(file, file_format, fields):
+    """Возвращает итератор записей файла в формате json, ndjson или csv."""
+    if file_format == 'json':
+        return iter(JsonArrayReader(file))
+    if file_format == 'ndjson':
+        return iter_ndjson(file)
+    return iter_csv(file, fields)
+
+
+def clean_item(model, fields, item):
+    """
+    Возвращает кортеж значений fields или None для некорректной записи.
+
+    Значения должны быть непустыми строками не длиннее max_length поля;
+    лишние ключи записи игнорируются.
+    """
+    if not isinstance(item, dict):
+        return None
+    values = []
+    for name in fields:
+        value = item.get(name)
+        if not isinstance(value, str):
+            return None
+        value = value.strip()
+        if not value or len(value) > model._meta.get_field(name).max_length:
+            return None
+        values.append(value)
+    return tuple(values)
+
+
+class OrmUpserter:
+    """
+    Добавляет и обновляет объекты через bulk_create и bulk_update.
+
+    Объект ищется по полю key (первое из fields). Если с таким ключом
+    уже есть объект с теми же значениями, запись пропускается; иначе
+    обновляется объект с наименьшим id.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.key, *self.update_fields = fields
+        self.fields = fields
+
+    def write(self, rows):
+        """Сохраняет {ключ: значения}; возвращает (добавлено, обновлено)."""
+        existing = defaultdict(list)
+        for instance in self.model.objects.filter(
+            **{f'{self.key}__in': list(rows)}
+        ).order_by('pk'):
+            existing[getattr(instance, self.key)].append(instance)
+        created, changed = [], []
+        for key, values in rows.items():
+            instances = existing.get(key)
+            if not instances:
+                created.append(self.model(**dict(zip(self.fields, values))))
+                continue
+            if any(
+                tuple(getattr(instance, name) for name in self.fields)
+                == values
+                for instance in instances
+            ):
+                continue
+            instance = instances[0]
+            for name, value in zip(self.fields, values):
+                setattr(instance, name, value)
+            changed.append(instance)
+        self.model.objects.bulk_create(created)
+        if changed:
+            self.model.objects.bulk_update(changed, self.update_fields)
+        return len(created), len(changed)
+
+
+class CopyUpserter:
+    """
+    То же, что OrmUpserter, но для PostgreSQL.
+
+    Пакет загружается командой COPY во временную таблицу, после чего
+    обновление и вставка выполняются двумя запросами на весь пакет.
+    Временная таблица удаляется при завершении транзакции.
+    """
+
+    staging = 'import_staging'
+
+    def __init__(self, model, fields, cursor):
+        quote = connection.ops.quote_name
+        meta = model._meta
+        table = quote(meta.db_table)
+        pk = quote(meta.pk.column)
+        key, *columns = [quote(meta.get_field(name).column) for name in fields]
+        all_columns = ', '.join([key, *columns])
+        assignments = ', '.join(
+            f'{column} = source.{column}' for column in columns
+        )
+        matches = ' AND '.join(
+            f'existing.{column} = source.{column}' for column in columns
+        )
+        self.cursor = cursor
+        self.copy_sql = (
+            f'COPY {self.staging} ({all_columns}) FROM STDIN WITH (FORMAT csv)'
+        )
+        self.update_sql = f"""
+            UPDATE {table} AS target SET {assignments}
+            FROM {self.staging} AS source
+            WHERE target.{pk} = (
+                SELECT min(existing.{pk}) FROM {table} AS existing
+                WHERE existing.{key} = source.{key}
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM {table} AS existing
+                WHERE existing.{key} = source.{key} AND {matches}
+            )
+        """
+        self.insert_sql = f"""
+            INSERT INTO {table} ({all_columns})
+            SELECT {all_columns} FROM {self.staging} AS source
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table} AS existing
+                WHERE existing.{key} = source.{key}
+            )
+        """
+        definitions = ', '.join(
+            f'{column} text' for column in [key, *columns]
+        )
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {self.staging} ({definitions}) '
+            f'ON COMMIT DROP'
+        )
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows.values())
+        buffer.seek(0)
+        self.cursor.copy_expert(self.copy_sql, buffer)
+        self.cursor.execute(self.update_sql)
+        updated = self.cursor.rowcount
+        self.cursor.execute(self.insert_sql)
+        inserted = self.cursor.rowcount
+        self.cursor.execute(f'TRUNCATE {self.staging}')
+        return inserted, updated
+
+
+def describe_conflict(model, fields, rows):
+    """
+    Описывает нарушение уникальности в пакете rows {ключ: значения}.
+
+    Ищет значение уникального поля, которое после загрузки досталось бы
+    объектам с разными ключами (например, два тега обменялись
+    названиями). Возвращает описание или None, если такого нет.
+    """
+    key, *others = fields
+    for index, name in enumerate(others, 1):
+        if not model._meta.get_field(name).unique:
+            continue
+        owners = defaultdict(set)
+        for row_key, values in rows.items():
+            owners[values[index]].add(row_key)
+        for value, owner in model.objects.filter(
+            **{f'{name}__in': list(owners)}
+        ).values_list(name, key):
+            owners[value].add(owner)
+        for value, keys in owners.items():
+            if len(keys) > 1:
+                return (
+                    f'{name}={value!r} не может принадлежать сразу '
+                    f'нескольким объектам с {key}: {", ".join(sorted(keys))}'
+                )
+    return None
+
+
+def import_items(model, fields, items, batch_size, cursor=None,
+                 on_invalid=None):
+    """
+    Добавляет и обновляет объекты model по записям items пакетами.
+
+    fields — поля записи, первое из них — ключ поиска существующего
+    объекта. Некорректные записи и повторы ключа внутри пакета
+    пропускаются (для некорректных вызывается on_invalid(номер записи)).
+    Если передан курсор PostgreSQL, пакеты загружаются через COPY.
+    Вызывающий код должен открыть транзакцию. Пакет, нарушающий
+    уникальность, вызывает ImportConflictError с описанием конфликта.
+    Возвращает Counter с ключами read, inserted, updated, skipped.
+    """
+    upserter = (
+        CopyUpserter(model, fields, cursor) if cursor is not None
+        else OrmUpserter(model, fields)
+    )
+    stats = Counter()
+    batch = {}
+
+    def flush():
+        try:
+            with transaction.atomic():
+                inserted, updated = upserter.write(batch)
+        except IntegrityError as error:
+            raise ImportConflictError(
+                describe_conflict(model, fields, batch) or str(error)
+            ) from error
+        stats['inserted'] += inserted
+        stats['updated'] += updated
+        stats['skipped'] += len(batch) - inserted - updated
+        batch.clear()
+
+    for number, item in enumerate(items, 1):
+        stats['read'] += 1
+        values = clean_item(model, fields, item)
+        if values is None:
+            stats['skipped'] += 1
+            if on_invalid:
+                on_invalid(number)
+            continue
+        if values[0] in batch:
+            stats['skipped'] += 1
+        batch[values[0]] = values
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return stats
@@ -1,12 +1,28 @@
-import json
+from timeit import default_timer
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.cache import bump_version
+from recipes.imports import (FORMATS_BY_EXTENSION, ImportConflictError,
+                             ImportFormatError, get_format, import_items,
+                             read_items)
+
+MAX_INVALID_REPORTS = 10
 
 
 class BaseImportCommand(BaseCommand):
-    """Базовый класс для импорта JSON данных в БД."""
+    """
+    Базовый класс для импорта справочников в БД.
+
+    Читает JSON-массив, NDJSON или CSV потоково и сохраняет записи
+    пакетами в одной транзакции. Существующие объекты ищутся по первому
+    из полей fields и обновляются (upsert). На PostgreSQL пакеты
+    загружаются командой COPY.
+    """
 
     model = None
+    fields = ()
     default_file_path = None
     help = None
 
@@ -16,25 +32,74 @@ class BaseImportCommand(BaseCommand):
             '--file',
             type=str,
             default=self.default_file_path,
-            help='Путь к JSON файлу'
+            help='Путь к файлу JSON, NDJSON или CSV'
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(set(FORMATS_BY_EXTENSION.values())),
+            help='Формат файла (по умолчанию — по расширению)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одном пакете'
         )
 
+    def report_invalid(self, number):
+        self.invalid_count += 1
+        if self.invalid_count <= MAX_INVALID_REPORTS:
+            self.stdout.write(self.style.WARNING(
+                f'Запись {number} пропущена: нужны непустые поля '
+                f'{", ".join(self.fields)}'
+            ))
+
     def handle(self, *args, **options):
         """Общая логика загрузки."""
+        path = options['file']
+        file_format = options['format'] or get_format(path)
+        if file_format is None:
+            raise CommandError(
+                f'Не удалось определить формат {path}, укажите --format'
+            )
         try:
-            with open(options['file'], 'r', encoding='utf-8') as file:
-                created = self.model.objects.bulk_create(
-                    (self.model(**item) for item in json.load(file)),
-                    ignore_conflicts=True,
-                )
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Загружено из {options["file"]}: {len(created)}'
-                    )
+            file = open(path, encoding='utf-8-sig', newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+
+        self.invalid_count = 0
+        started = default_timer()
+        with file, transaction.atomic():
+            cursor = (
+                connection.cursor() if connection.vendor == 'postgresql'
+                else None
+            )
+            try:
+                stats = import_items(
+                    self.model,
+                    self.fields,
+                    read_items(file, file_format, self.fields),
+                    options['batch_size'],
+                    cursor=cursor,
+                    on_invalid=self.report_invalid
                 )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(
-                    f'Ошибка при загрузке {options["file"]}: {e}'
+            except (ImportFormatError, UnicodeDecodeError) as error:
+                raise CommandError(f'Ошибка разбора {path}: {error}')
+            except ImportConflictError as error:
+                raise CommandError(
+                    f'Конфликт при загрузке {path}: {error}. '
+                    f'Изменения не сохранены'
                 )
-            )
+            finally:
+                if cursor is not None:
+                    cursor.close()
+        elapsed = default_timer() - started
+
+        if stats['inserted'] or stats['updated']:
+            bump_version(self.model)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено из {path}: добавлено {stats["inserted"]}, '
+            f'обновлено {stats["updated"]}, пропущено {stats["skipped"]} '
+            f'из {stats["read"]} за {elapsed:.2f} с '
+            f'({stats["read"] / elapsed:.0f} записей/с)'
+        ))
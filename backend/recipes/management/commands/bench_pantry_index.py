@@ -0,0 +1,67 @@
+import random
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from recipes.pantry import PantryIndex
+
+
+class Command(BaseCommand):
+    """
+    Замеряет подбор рецептов по ингредиентам на синтетических данных.
+
+    Строит PantryIndex без базы данных: рецепты получают от 3 до 15
+    ингредиентов, популярность ингредиентов убывает по закону Ципфа.
+    Выводит время построения индекса и среднее время подбора с
+    извлечением первой страницы.
+    """
+
+    help = 'Замеряет скорость индекса подбора рецептов по ингредиентам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument(
+            '--query-size',
+            type=int,
+            default=20,
+            help='Количество ингредиентов в одном запросе'
+        )
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        ingredients = range(options['ingredients'])
+        weights = [1 / (rank + 1) for rank in ingredients]
+        rows = [
+            (recipe_id, ingredient_id)
+            for recipe_id in range(1, options['recipes'] + 1)
+            for ingredient_id in set(generator.choices(
+                ingredients, weights=weights, k=generator.randint(3, 15)
+            ))
+        ]
+        index = PantryIndex(max_replay=0)
+        start = default_timer()
+        index.load(rows)
+        build_time = default_timer() - start
+
+        queries = [
+            generator.sample(ingredients, options['query_size'])
+            for _ in range(options['repeat'])
+        ]
+        found = 0
+        start = default_timer()
+        for query in queries:
+            match = index.match(query, sync=False)
+            match[0:10]
+            found += len(match)
+        query_time = (default_timer() - start) / len(queries)
+
+        self.stdout.write(
+            f'Рецептов: {options["recipes"]}, связей: {len(rows)}\n'
+            f'Построение индекса: {build_time:.2f} с\n'
+            f'Подбор по {options["query_size"]} ингредиентам: '
+            f'{query_time * 1000:.3f} мс '
+            f'(в среднем найдено {found // len(queries)})'
+        )
@@ -0,0 +1,81 @@
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import RecipeSimilarity
+from recipes.similarity import (build_matrix, iter_similarity_blocks,
+                                load_interactions)
+
+
+class Command(BaseCommand):
+    """
+    Management команда для расчёта похожих рецептов.
+
+    Строит матрицу «рецепт × пользователь» по избранному и корзинам,
+    считает косинусное сходство рецептов блоками и сохраняет для каждого
+    рецепта лучших соседей в RecipeSimilarity. Старые данные заменяются
+    в одной транзакции, поэтому API до её завершения отдаёт прежние
+    результаты. Рассчитана на ночной запуск.
+    """
+
+    help = 'Пересчитывает похожие рецепты по избранному и корзинам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=settings.SIMILAR_RECIPES_LIMIT,
+            help='Количество похожих рецептов, сохраняемых для рецепта'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов в одном блоке матрицы сходства'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество строк, читаемых и записываемых за один раз'
+        )
+
+    def handle(self, *args, **options):
+        started = default_timer()
+        users, recipes, weights = load_interactions(options['batch_size'])
+        self.stdout.write(
+            f'Загружено связей: {len(users)} '
+            f'({default_timer() - started:.1f} с)'
+        )
+        step = default_timer()
+        recipe_ids, matrix = build_matrix(users, recipes, weights)
+        del users, recipes, weights
+        self.stdout.write(
+            f'Матрица: {matrix.shape[0]} рецептов × '
+            f'{matrix.shape[1]} пользователей, '
+            f'{matrix.nnz} значений ({default_timer() - step:.1f} с)'
+        )
+
+        step = default_timer()
+        saved = 0
+        with transaction.atomic():
+            RecipeSimilarity.objects.all().delete()
+            for done, similarities in iter_similarity_blocks(
+                recipe_ids, matrix, options['limit'], options['chunk_size']
+            ):
+                RecipeSimilarity.objects.bulk_create(
+                    similarities, batch_size=options['batch_size']
+                )
+                saved += len(similarities)
+                elapsed = default_timer() - step
+                self.stdout.write(
+                    f'Рецептов: {done}/{len(recipe_ids)}, '
+                    f'записано {saved}, {elapsed:.1f} с, '
+                    f'{done / elapsed:.0f} рецептов/с'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны: {saved} строк '
+            f'за {default_timer() - started:.1f} с'
+        ))
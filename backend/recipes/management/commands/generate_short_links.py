@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.short_links import create_short_links
+
+
+class Command(BaseCommand):
+    """
+    Management команда для создания коротких ссылок.
+
+    Выдаёт коды всем рецептам, у которых их ещё нет, пакетами,
+    чтобы ссылки не создавались по одной при первом запросе.
+    """
+
+    help = 'Создаёт короткие ссылки для рецептов без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов в одном пакете'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = Recipe.objects.filter(
+            short_link__isnull=True
+        ).order_by('pk').values_list('pk', flat=True)
+        created = 0
+        last_pk = 0
+        while True:
+            batch = list(recipe_ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            create_short_links(batch, batch_size=batch_size)
+            created += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано коротких ссылок: {created}')
+        )
@@ -5,12 +5,14 @@ from .base import BaseImportCommand
 
 class Command(BaseImportCommand):
     """
-    Management команда для загрузки ингредиентов из JSON файла.
+    Management команда для загрузки ингредиентов.
 
     Загружает список ингредиентов в базу данных и выводит
-    статистику загрузки.
+    статистику загрузки. Для ингредиента с уже известным названием
+    обновляется единица измерения. CSV без заголовка: name,measurement_unit.
     """
 
     model = Ingredient
-    default_file_path = 'data/ingredients.json'
-    help = 'Загружает ингредиенты из JSON файла в БД'
+    fields = ('name', 'measurement_unit')
+    default_file_path = 'data/ingredients.csv'
+    help = 'Загружает ингредиенты из JSON, NDJSON или CSV файла в БД'
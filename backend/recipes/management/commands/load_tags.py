@@ -5,5 +5,6 @@ from .base import BaseImportCommand
 
 class Command(BaseImportCommand):
     model = Tag
+    fields = ('slug', 'name')
     default_file_path = 'data/tags.json'
-    help = 'Загружает теги из JSON файла в БД'
+    help = 'Загружает теги из JSON, NDJSON или CSV файла в БД'
@@ -0,0 +1,141 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from recipes.images import IMAGE_PIPELINES, render_variants
+
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+class InlineExecutor:
+    """Выполняет задачи в текущем процессе (для --workers 0)."""
+
+    def map(self, func, *iterables):
+        return map(func, *iterables)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _render(args):
+    """Строит варианты в процессе пула, возвращая ошибку вместо исключения."""
+    data, variants = args
+    try:
+        return render_variants(data, variants), None
+    except IMAGE_ERRORS as error:
+        return None, str(error)
+
+
+class Command(BaseCommand):
+    """
+    Management команда для построения вариантов изображений.
+
+    Находит рецепты и пользователей, для текущих изображений которых ещё
+    нет уменьшенных копий, и строит их в пуле процессов. Запросы к API
+    только сохраняют оригинал, поэтому ресайз не занимает веб-воркеры.
+    Изображение, которое не удалось обработать IMAGE_MAX_ATTEMPTS раз,
+    не выбирается повторно в течение IMAGE_FAILURE_TIMEOUT секунд.
+    """
+
+    help = 'Строит варианты изображений рецептов и аватаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Количество процессов (0 — без пула, в текущем процессе)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Количество изображений, читаемых из БД за один раз'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а проверять новые изображения периодически'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками в режиме --loop, секунд'
+        )
+
+    def handle(self, *args, **options):
+        executor = (
+            ProcessPoolExecutor(options['workers'])
+            if options['workers'] > 0 else InlineExecutor()
+        )
+        try:
+            while True:
+                processed = sum(
+                    self.process(pipeline, executor, options['batch_size'])
+                    for pipeline in IMAGE_PIPELINES
+                )
+                if not options['loop']:
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+        finally:
+            executor.shutdown()
+
+    def process(self, pipeline, executor, batch_size):
+        """Обрабатывает все изображения поля, ожидающие вариантов."""
+        label = f'{pipeline.model.__name__}.{pipeline.field}'
+        processed = failed = 0
+        started = time.monotonic()
+        last_pk = 0
+        while True:
+            batch = list(
+                pipeline.pending().filter(pk__gt=last_pk).values_list(
+                    'pk', pipeline.field
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            sources = []
+            for pk, name in batch:
+                try:
+                    sources.append((pk, name, pipeline.read(name)))
+                except OSError as error:
+                    failed += 1
+                    self.report_failure(pipeline, pk, name, error)
+            results = executor.map(
+                _render,
+                [(data, pipeline.variants) for _, _, data in sources]
+            )
+            saved = 0
+            for (pk, name, _), (rendered, error) in zip(sources, results):
+                if error:
+                    failed += 1
+                    self.report_failure(pipeline, pk, name, error)
+                elif pipeline.save(pk, name, rendered):
+                    saved += 1
+            if saved:
+                pipeline.invalidate()
+                processed += saved
+        if processed or failed:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{label}: обработано {processed}, ошибок {failed} '
+                    f'за {time.monotonic() - started:.1f} с'
+                )
+            )
+        return processed
+
+    def report_failure(self, pipeline, pk, name, error):
+        """Записывает неудачную попытку и сообщает о ней."""
+        label = f'{pipeline.model.__name__}.{pipeline.field}'
+        attempts = pipeline.record_failure(pk, name)
+        message = f'{label} #{pk} ({name}): {error}'
+        if attempts >= settings.IMAGE_MAX_ATTEMPTS:
+            message += f' — пропущено после {attempts} попыток'
+        self.stderr.write(message)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    """
+    Management команда для пересборки лент подписок.
+
+    Нужна после изменения FEED_FANOUT_LIMIT и для авторов, у которых
+    число подписчиков опустилось до лимита.
+    """
+
+    help = 'Пересобирает ленты подписок пользователей'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_feeds()
+        self.stdout.write(
+            self.style.SUCCESS(f'Ленты пересобраны, записей: {count}')
+        )
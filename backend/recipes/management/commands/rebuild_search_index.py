@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import refresh_search_index
+
+
+class Command(BaseCommand):
+    """
+    Management команда для пересборки поискового индекса рецептов.
+
+    Нужна после изменений данных в обход ORM (например, импорта SQL),
+    когда сигналы не обновили поисковые документы.
+    """
+
+    help = 'Пересобирает поисковый индекс рецептов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            refresh_search_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import COUNTERS, reconcile_counter
+
+
+class Command(BaseCommand):
+    """
+    Management команда для сверки денормализованных счётчиков.
+
+    Пересчитывает счётчики рецептов и пользователей по фактическим
+    связям и исправляет только расходящиеся значения.
+    """
+
+    help = 'Исправляет расхождения счётчиков рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество строк в одном пакете обновления'
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            fixed = reconcile_counter(
+                model, field, related_model, related_field,
+                batch_size=options['batch_size']
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{model.__name__}.{field}: исправлено {fixed}'
+                )
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import renormalize_trending
+
+
+class Command(BaseCommand):
+    """
+    Management команда для пересчёта баллов популярности рецептов.
+
+    Переносит точку отсчёта баллов на текущий момент (см.
+    recipes.trending). Запускается периодически, например раз в сутки.
+    """
+
+    help = 'Переносит точку отсчёта баллов популярности рецептов'
+
+    def handle(self, *args, **options):
+        factor = renormalize_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Баллы популярности умножены на {factor:.6g}')
+        )
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс (tag_id, recipe_id) для автоматической таблицы Recipe.tags.
+
+    Промежуточная таблица создаётся Django без явной модели, поэтому
+    индекс добавляется SQL-операцией.
+    """
+
+    dependencies = [
+        ('recipes', '0004_recipe_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX recipe_tags_tag_recipe_idx '
+                'ON recipes_recipe_tags (tag_id, recipe_id);'
+            ),
+            reverse_sql='DROP INDEX recipe_tags_tag_recipe_idx;',
+        ),
+    ]
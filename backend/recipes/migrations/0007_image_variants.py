@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_processed',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Изображение, для которого готовы варианты'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_processed',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Аватар, для которого готовы варианты'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='shortlink',
+            options={'verbose_name': 'Короткая ссылка', 'verbose_name_plural': 'Короткие ссылки'},
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='code',
+            field=models.CharField(max_length=10, unique=True, verbose_name='Код'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='short_link', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddConstraint(
+            model_name='shortlink',
+            constraint=models.UniqueConstraint(fields=('recipe',), name='unique_short_link_recipe'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.db import migrations
+
+FORWARD_SQL = {
+    'postgresql': [
+        'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector;',
+        'CREATE INDEX recipe_search_vector_idx '
+        'ON recipes_recipe USING GIN (search_vector);',
+        """
+        UPDATE recipes_recipe AS recipe SET search_vector =
+            setweight(to_tsvector(
+                'russian', translate(recipe.name, 'ёЁ', 'еЕ')
+            ), 'A')
+            || setweight(to_tsvector('russian', translate(coalesce((
+                SELECT string_agg(ingredient.name, ' ')
+                FROM recipes_recipeingredient AS recipe_ingredient
+                JOIN recipes_ingredient AS ingredient
+                    ON ingredient.id = recipe_ingredient.ingredient_id
+                WHERE recipe_ingredient.recipe_id = recipe.id
+            ), ''), 'ёЁ', 'еЕ')), 'B')
+            || setweight(to_tsvector(
+                'russian', translate(recipe.text, 'ёЁ', 'еЕ')
+            ), 'C');
+        """,
+    ],
+    'sqlite': [
+        'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+        "name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2'"
+        ');',
+        """
+        INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text)
+        SELECT
+            recipe.id,
+            replace(replace(recipe.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(coalesce((
+                SELECT group_concat(ingredient.name, ' ')
+                FROM recipes_recipeingredient AS recipe_ingredient
+                JOIN recipes_ingredient AS ingredient
+                    ON ingredient.id = recipe_ingredient.ingredient_id
+                WHERE recipe_ingredient.recipe_id = recipe.id
+            ), ''), 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(recipe.text, 'ё', 'е'), 'Ё', 'Е')
+        FROM recipes_recipe AS recipe;
+        """,
+    ],
+}
+REVERSE_SQL = {
+    'postgresql': [
+        'DROP INDEX recipe_search_vector_idx;',
+        'ALTER TABLE recipes_recipe DROP COLUMN search_vector;',
+    ],
+    'sqlite': [
+        'DROP TABLE recipes_recipe_fts;',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in FORWARD_SQL[schema_editor.connection.vendor]:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in REVERSE_SQL[schema_editor.connection.vendor]:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    """
+    Полнотекстовый поиск рецептов.
+
+    PostgreSQL: столбец tsvector с индексом GIN. SQLite: теневая таблица
+    FTS5. Обе структуры не описаны в моделях и обслуживаются
+    recipes.search; SQL первичного заполнения повторён здесь, чтобы
+    миграция не зависела от текущего кода приложения.
+    """
+
+    dependencies = [
+        ('recipes', '0008_shortlink_recipe_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_epoch(apps, schema_editor):
+    apps.get_model('recipes', 'TrendingEpoch').objects.create(
+        pk=1, started_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Точка отсчёта')),
+            ],
+            options={
+                'verbose_name': 'Точка отсчёта популярности',
+                'verbose_name_plural': 'Точки отсчёта популярности',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.RunPython(create_epoch, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def create_sequence(apps, schema_editor):
+    apps.get_model('recipes', 'PantrySequence').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PantrySequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Номер')),
+            ],
+            options={
+                'verbose_name': 'Номер журнала составов',
+                'verbose_name_plural': 'Номера журнала составов',
+            },
+        ),
+        migrations.RunPython(create_sequence, migrations.RunPython.noop),
+    ]
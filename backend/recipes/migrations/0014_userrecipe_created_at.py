@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# Веса recipes.trending.TRENDING_WEIGHTS на момент миграции.
+TRENDING_WEIGHTS = (
+    ('Favorite', 1.0),
+    ('ShoppingCart', 0.5),
+)
+
+
+def seed_trending(apps, schema_editor):
+    """
+    Заполняет баллы популярности по уже существующим связям.
+
+    Всем прежним связям проставлена одна дата добавления — момент
+    миграции, поэтому вклад каждой равен весу, приведённому к точке
+    отсчёта, а балл рецепта считается одним UPDATE по числу связей.
+    """
+    epoch = apps.get_model('recipes', 'TrendingEpoch').objects.filter(
+        pk=1
+    ).first()
+    if epoch is None:
+        return
+    elapsed = (timezone.now() - epoch.started_at).total_seconds()
+    factor = 2 ** (elapsed / settings.TRENDING_HALF_LIFE)
+    score = Value(0.0)
+    for model_name, weight in TRENDING_WEIGHTS:
+        count = Subquery(
+            apps.get_model('recipes', model_name).objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                count=Count('*')
+            ).values('count')
+        )
+        score = score + Coalesce(count, 0) * weight * factor
+    apps.get_model('recipes', 'Recipe').objects.update(
+        trending_score=models.ExpressionWrapper(
+            score, output_field=models.FloatField()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_pantrysequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(seed_trending, migrations.RunPython.noop),
+    ]
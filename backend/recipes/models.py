@@ -2,12 +2,50 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from django.db import models
 
-from .constants import MIN_AMOUNT, MIN_COOKING_TIME
+from .constants import MIN_AMOUNT, MIN_COOKING_TIME, SHORT_LINK_MAX_LENGTH
 
 
-class User(AbstractUser):
+class DenormalizedModel(models.Model):
+    """
+    Модель с полями, которые меняются только атомарными UPDATE.
+
+    Счётчики и отметки обработки изображений обновляются через F() и
+    update() в обход save(). Полное сохранение объекта записало бы
+    обратно значения, прочитанные в начале запроса, и затёрло бы
+    параллельные изменения, поэтому save() без update_fields пишет все
+    поля, кроме denormalized_fields.
+    """
+
+    denormalized_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(DenormalizedModel, AbstractUser):
     """Кастомная модель пользователя."""
 
+    denormalized_fields = (
+        'avatar_processed', 'recipes_count', 'subscriptions_count',
+        'subscribers_count',
+    )
+
     email = models.EmailField(
         max_length=254,
         unique=True,
@@ -32,6 +70,28 @@ class User(AbstractUser):
         null=True,
         verbose_name='Аватар'
     )
+    avatar_processed = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Аватар, для которого готовы варианты'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписок'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -137,9 +197,14 @@ class Ingredient(models.Model):
         verbose_name_plural = 'Ингредиенты'
 
 
-class Recipe(models.Model):
+class Recipe(DenormalizedModel):
     """Рецепт, созданный пользователем."""
 
+    denormalized_fields = (
+        'image_processed', 'favorites_count', 'shopping_carts_count',
+        'trending_score',
+    )
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -153,6 +218,13 @@ class Recipe(models.Model):
         upload_to='recipes/',
         verbose_name='Изображение блюда'
     )
+    image_processed = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Изображение, для которого готовы варианты'
+    )
     text = models.TextField(
         verbose_name='Описание приготовления'
     )
@@ -175,6 +247,21 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания рецепта'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность'
+    )
 
     def __str__(self):
         """Возвращает название рецепта."""
@@ -183,10 +270,56 @@ class Recipe(models.Model):
     class Meta:
         default_related_name = 'recipes'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_id_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
 
+class TrendingEpoch(models.Model):
+    """
+    Момент, к которому приведены баллы популярности рецептов.
+
+    Хранится единственной строкой; сдвигается командой
+    renormalize_trending (см. recipes.trending).
+    """
+
+    started_at = models.DateTimeField(verbose_name='Точка отсчёта')
+
+    def __str__(self):
+        return f'Популярность от {self.started_at:%d.%m.%Y %H:%M}'
+
+    class Meta:
+        verbose_name = 'Точка отсчёта популярности'
+        verbose_name_plural = 'Точки отсчёта популярности'
+
+
+class PantrySequence(models.Model):
+    """
+    Номер последней записи журнала изменений составов рецептов.
+
+    Хранится единственной строкой; номер выдаётся под блокировкой строки,
+    поэтому два процесса не получат одинаковый (см. recipes.pantry).
+    """
+
+    value = models.BigIntegerField(default=0, verbose_name='Номер')
+
+    def __str__(self):
+        return f'Журнал составов: {self.value}'
+
+    class Meta:
+        verbose_name = 'Номер журнала составов'
+        verbose_name_plural = 'Номера журнала составов'
+
+
 class RecipeIngredient(models.Model):
     """Промежуточная модель между Recipe и Ingredient."""
 
@@ -237,6 +370,10 @@ class UserRecipeBase(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления'
+    )
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe}'
@@ -266,3 +403,112 @@ class ShoppingCart(UserRecipeBase):
     class Meta(UserRecipeBase.Meta):
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины покупок'
+
+
+class ShortLink(models.Model):
+    """Короткий код для ссылки на рецепт."""
+
+    code = models.CharField(
+        max_length=SHORT_LINK_MAX_LENGTH,
+        unique=True,
+        verbose_name='Код'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link',
+        verbose_name='Рецепт'
+    )
+
+    def __str__(self):
+        return f'{self.code} → {self.recipe_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe'],
+                name='unique_short_link_recipe'
+            )
+        ]
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя.
+
+    Строки создаются при публикации рецепта для каждого подписчика
+    автора (recipes.feed). Дата создания рецепта скопирована в запись,
+    чтобы страница ленты читалась по одному индексу без соединений.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    created_at = models.DateTimeField(verbose_name='Дата создания рецепта')
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте {self.user_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='feed_entry_user_created_idx'
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Похожий рецепт: его добавляют в избранное и корзину те же люди.
+
+    Таблица заполняется командой build_similar_recipes и хранит для
+    каждого рецепта не более SIMILAR_RECIPES_LIMIT соседей.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        db_index=False,
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id} ({self.score:.3f})'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipe_similarity_score_idx'
+            ),
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
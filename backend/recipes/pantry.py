@@ -0,0 +1,311 @@
+import threading
+from collections import defaultdict
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .cache import collect_on_commit
+from .models import PantrySequence, RecipeIngredient
+
+SEQUENCE_PK = 1
+CHANGE_KEY = 'pantry:change:{number}'
+
+
+def popcount(bits):
+    """Количество единичных битов (int.bit_count есть с Python 3.10)."""
+    bit_count = getattr(bits, 'bit_count', None)
+    return bit_count() if bit_count else bin(bits).count('1')
+
+
+def bits_from_positions(positions, size):
+    """Собирает битовое множество из позиций через bytearray за O(n)."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_positions(bits, limit=None):
+    """Возвращает позиции единичных битов от старших к младшим."""
+    positions = []
+    while bits and (limit is None or len(positions) < limit):
+        position = bits.bit_length() - 1
+        positions.append(position)
+        bits ^= 1 << position
+    return positions
+
+
+def count_slices(bitsets):
+    """
+    Складывает битовые множества «столбиком».
+
+    Возвращает разряды счётчика: бит позиции p в slices[k] равен k-му
+    биту числа множеств, содержащих p.
+    """
+    slices = []
+    for carry in bitsets:
+        for index, current in enumerate(slices):
+            slices[index], carry = current ^ carry, current & carry
+            if not carry:
+                break
+        if carry:
+            slices.append(carry)
+    return slices
+
+
+def equal_to(slices, number, universe):
+    """Возвращает позиции из universe, где счётчик равен number."""
+    if number >> len(slices):
+        return 0
+    mask = universe
+    for index, bits in enumerate(slices):
+        mask &= bits if number >> index & 1 else ~bits
+    return mask
+
+
+def append_changes(recipe_ids):
+    """
+    Добавляет в журнал запись об изменении составов рецептов.
+
+    Номер записи выдаётся под блокировкой строки PantrySequence, и запись
+    попадает в кэш до фиксации номера: прочитав номер, другой процесс
+    найдёт в кэше все записи до него включительно.
+    """
+    with transaction.atomic():
+        sequence, _ = PantrySequence.objects.select_for_update(
+        ).get_or_create(pk=SEQUENCE_PK)
+        sequence.value = F('value') + 1
+        sequence.save(update_fields=['value'])
+        sequence.refresh_from_db(fields=['value'])
+        cache.set(
+            CHANGE_KEY.format(number=sequence.value),
+            sorted(recipe_ids),
+            settings.PANTRY_CHANGE_TIMEOUT
+        )
+
+
+def get_sequence():
+    """Возвращает номер последней записи журнала или None."""
+    return PantrySequence.objects.filter(pk=SEQUENCE_PK).values_list(
+        'value', flat=True
+    ).first()
+
+
+def log_recipe_change(recipe_id):
+    """
+    Записывает в общий журнал, что состав рецепта изменился.
+
+    Запись делается после фиксации транзакции, одна на транзакцию;
+    индексы всех процессов применяют журнал при следующем запросе.
+    """
+    collect_on_commit('pantry_changes', [recipe_id], append_changes)
+
+
+class PantryMatch:
+    """
+    Рецепты, содержащие хотя бы один из ингредиентов запроса.
+
+    Порядок: сначала меньше недостающих ингредиентов, затем больше
+    совпавших, затем более новые рецепты. Поддерживает len() и срезы,
+    поэтому подходит для стандартной пагинации; позиции извлекаются
+    только для запрошенного среза. Элементы — кортежи
+    (id рецепта, совпало, не хватает).
+    """
+
+    def __init__(self, groups, recipe_ids, total):
+        self.groups = groups
+        self.recipe_ids = recipe_ids
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def count(self):
+        return self.total
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self.total)
+        wanted = stop - start
+        result = []
+        for matched, missing, bits in self.groups:
+            if len(result) >= wanted:
+                break
+            size = popcount(bits)
+            if start >= size:
+                start -= size
+                continue
+            positions = iter_positions(bits, start + wanted - len(result))
+            result.extend(
+                (self.recipe_ids[position], matched, missing)
+                for position in positions[start:]
+            )
+            start = 0
+        return result
+
+
+class PantryIndex:
+    """
+    Обратный индекс «ингредиент → рецепты» на битовых множествах.
+
+    Каждому рецепту присвоена позиция; для ингредиента хранится целое
+    число, в котором выставлены биты рецептов с этим ингредиентом, а для
+    каждого размера состава — биты рецептов с таким числом ингредиентов.
+    Подсчёт совпадений по запросу сводится к нескольким десяткам
+    побитовых операций над целыми числами.
+
+    Индекс живёт в памяти процесса. Изменения состава рецептов
+    применяются по журналу из общего кэша (log_recipe_change) только для
+    затронутых рецептов; при разрыве журнала индекс строится заново.
+    """
+
+    def __init__(self, max_replay):
+        self.max_replay = max_replay
+        self.sequence = None
+        self.recipe_ids = []
+        self.positions = {}
+        self.compositions = {}
+        self.ingredient_bits = {}
+        self.size_bits = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def load(self, rows, sequence=None):
+        """Строит индекс по парам (id рецепта, id ингредиента)."""
+        recipe_ids = []
+        compositions = {}
+        by_ingredient = defaultdict(list)
+        by_size = defaultdict(list)
+        for recipe_id, pairs in groupby(sorted(rows), key=lambda row: row[0]):
+            position = len(recipe_ids)
+            recipe_ids.append(recipe_id)
+            composition = frozenset(ingredient for _, ingredient in pairs)
+            compositions[position] = composition
+            by_size[len(composition)].append(position)
+            for ingredient_id in composition:
+                by_ingredient[ingredient_id].append(position)
+        size = len(recipe_ids)
+        self.recipe_ids = recipe_ids
+        self.positions = {
+            recipe_id: position
+            for position, recipe_id in enumerate(recipe_ids)
+        }
+        self.compositions = compositions
+        self.ingredient_bits = {
+            ingredient_id: bits_from_positions(positions, size)
+            for ingredient_id, positions in by_ingredient.items()
+        }
+        self.size_bits = defaultdict(int, {
+            count: bits_from_positions(positions, size)
+            for count, positions in by_size.items()
+        })
+        self.sequence = sequence
+
+    def apply(self, compositions):
+        """
+        Обновляет рецепты по их новому составу {id рецепта: ингредиенты}.
+
+        Пустой состав означает, что рецепт удалён или его нельзя
+        приготовить ни из чего.
+        """
+        for recipe_id, composition in compositions.items():
+            composition = frozenset(composition)
+            position = self.positions.get(recipe_id)
+            if position is None:
+                if not composition:
+                    continue
+                position = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+                self.positions[recipe_id] = position
+            bit = 1 << position
+            old = self.compositions.get(position, frozenset())
+            for ingredient_id in old - composition:
+                self.ingredient_bits[ingredient_id] &= ~bit
+            for ingredient_id in composition - old:
+                self.ingredient_bits[ingredient_id] = (
+                    self.ingredient_bits.get(ingredient_id, 0) | bit
+                )
+            if old:
+                self.size_bits[len(old)] &= ~bit
+            if composition:
+                self.size_bits[len(composition)] |= bit
+                self.compositions[position] = composition
+            else:
+                self.compositions.pop(position, None)
+
+    def rebuild(self, sequence=None):
+        """
+        Строит индекс заново по всей таблице RecipeIngredient.
+
+        sequence — номер журнала, прочитанный до чтения составов.
+        """
+        if sequence is None:
+            sequence = get_sequence()
+        self.load(
+            RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id'),
+            sequence
+        )
+
+    def sync(self):
+        """Применяет журнал изменений или перестраивает индекс."""
+        sequence = get_sequence()
+        if sequence == self.sequence and sequence is not None:
+            return
+        if (
+            self.sequence is None or sequence is None
+            or sequence < self.sequence
+            or sequence - self.sequence > self.max_replay
+        ):
+            self.rebuild(sequence)
+            return
+        keys = [
+            CHANGE_KEY.format(number=number)
+            for number in range(self.sequence + 1, sequence + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            self.rebuild(sequence)
+            return
+        recipe_ids = set().union(*changes.values())
+        compositions = {recipe_id: set() for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            compositions[recipe_id].add(ingredient_id)
+        self.apply(compositions)
+        self.sequence = sequence
+
+    def match(self, ingredient_ids, sync=True):
+        """Возвращает PantryMatch для набора ингредиентов."""
+        with self._lock:
+            if sync:
+                self.sync()
+            bitsets = [
+                self.ingredient_bits[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if self.ingredient_bits.get(ingredient_id)
+            ]
+            universe = 0
+            for bits in bitsets:
+                universe |= bits
+            slices = count_slices(bitsets)
+            by_matched = [
+                (matched, equal_to(slices, matched, universe))
+                for matched in range(len(bitsets), 0, -1)
+            ]
+            groups = []
+            for size, size_bits in self.size_bits.items():
+                for matched, matched_bits in by_matched:
+                    if matched > size or not matched_bits:
+                        continue
+                    bits = matched_bits & size_bits
+                    if bits:
+                        groups.append((matched, size - matched, bits))
+            groups.sort(key=lambda group: (group[1], -group[0]))
+            return PantryMatch(groups, self.recipe_ids, popcount(universe))
+
+
+pantry_index = PantryIndex(max_replay=settings.PANTRY_MAX_REPLAY)
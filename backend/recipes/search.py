@@ -0,0 +1,178 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .cache import collect_on_commit
+
+SEARCH_CONFIG = 'russian'
+SQLITE_FTS_TABLE = 'recipes_recipe_fts'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_query(query):
+    """Заменяет «ё» на «е»: так же нормализуются индексируемые тексты."""
+    return query.replace('ё', 'е').replace('Ё', 'Е')
+
+
+class PostgresRecipeSearch:
+    """
+    Поиск по столбцу recipes_recipe.search_vector (tsvector, индекс GIN).
+
+    Документ рецепта состоит из названия (вес A), названий ингредиентов
+    (вес B) и описания (вес C) с русской морфологией. Столбец не описан
+    в модели: он создаётся миграцией и обновляется refresh().
+    """
+
+    refresh_sql = f"""
+        UPDATE recipes_recipe AS recipe SET search_vector =
+            setweight(to_tsvector(
+                '{SEARCH_CONFIG}', translate(recipe.name, 'ёЁ', 'еЕ')
+            ), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', translate(coalesce((
+                SELECT string_agg(ingredient.name, ' ')
+                FROM recipes_recipeingredient AS recipe_ingredient
+                JOIN recipes_ingredient AS ingredient
+                    ON ingredient.id = recipe_ingredient.ingredient_id
+                WHERE recipe_ingredient.recipe_id = recipe.id
+            ), ''), 'ёЁ', 'еЕ')), 'B')
+            || setweight(to_tsvector(
+                '{SEARCH_CONFIG}', translate(recipe.text, 'ёЁ', 'еЕ')
+            ), 'C')
+    """
+
+    def refresh(self, cursor, recipe_ids=None):
+        if recipe_ids is None:
+            cursor.execute(self.refresh_sql)
+        else:
+            cursor.execute(
+                f'{self.refresh_sql} WHERE recipe.id = ANY(%s)',
+                [list(recipe_ids)]
+            )
+
+    def search(self, recipes, query):
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return recipes.filter(
+            RawSQL(
+                f'recipes_recipe.search_vector @@ {tsquery}',
+                [query],
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank_cd(recipes_recipe.search_vector, {tsquery})',
+                [query],
+                output_field=FloatField()
+            )
+        )
+
+
+class SqliteRecipeSearch:
+    """
+    Поиск по теневой таблице FTS5 для локального запуска на SQLite.
+
+    rowid таблицы совпадает с id рецепта. Морфологии нет, поэтому каждое
+    слово запроса ищется как префикс; релевантность считается bm25
+    с теми же приоритетами полей, что и на PostgreSQL.
+    """
+
+    document_sql = f"""
+        INSERT INTO {SQLITE_FTS_TABLE} (rowid, name, ingredients, text)
+        SELECT
+            recipe.id,
+            replace(replace(recipe.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(coalesce((
+                SELECT group_concat(ingredient.name, ' ')
+                FROM recipes_recipeingredient AS recipe_ingredient
+                JOIN recipes_ingredient AS ingredient
+                    ON ingredient.id = recipe_ingredient.ingredient_id
+                WHERE recipe_ingredient.recipe_id = recipe.id
+            ), ''), 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(recipe.text, 'ё', 'е'), 'Ё', 'Е')
+        FROM recipes_recipe AS recipe
+    """
+
+    def refresh(self, cursor, recipe_ids=None):
+        if recipe_ids is None:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+            cursor.execute(self.document_sql)
+            return
+        recipe_ids = list(recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(
+            f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+        cursor.execute(
+            f'{self.document_sql} WHERE recipe.id IN ({placeholders})',
+            recipe_ids
+        )
+
+    def search(self, recipes, query):
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return recipes.annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            ).none()
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        matches = (
+            f'SELECT rowid FROM {SQLITE_FTS_TABLE} '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s'
+        )
+        return recipes.filter(
+            RawSQL(
+                f'recipes_recipe.id IN ({matches})',
+                [match],
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'(SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 4.0, 1.0) '
+                f'FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s '
+                f'AND rowid = recipes_recipe.id)',
+                [match],
+                output_field=FloatField()
+            )
+        )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresRecipeSearch(),
+    'sqlite': SqliteRecipeSearch(),
+}
+
+
+def get_search_backend():
+    return SEARCH_BACKENDS[connection.vendor]
+
+
+def refresh_search_index(recipe_ids=None):
+    """
+    Пересобирает поисковые документы рецептов (всех, если ids не заданы).
+    """
+    if recipe_ids is not None and not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        get_search_backend().refresh(cursor, recipe_ids)
+
+
+def refresh_search_index_on_commit(recipe_ids):
+    """
+    Обновляет поисковые документы после фиксации транзакции.
+
+    К этому моменту у нового рецепта уже сохранены ингредиенты. Рецепт,
+    изменённый в транзакции несколько раз (сам рецепт и его ингредиенты),
+    обновляется один раз.
+    """
+    collect_on_commit('search_refresh', recipe_ids, refresh_search_index)
+
+
+def search_recipes(recipes, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и добавляет search_rank.
+
+    Чем больше search_rank, тем выше релевантность.
+    """
+    return get_search_backend().search(recipes, normalize_query(query))
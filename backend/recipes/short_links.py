@@ -0,0 +1,145 @@
+import re
+import secrets
+import string
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import SHORT_LINK_CODE_LENGTH, SHORT_LINK_MAX_LENGTH
+from .models import ShortLink
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+CODE_RE = re.compile(rf'^[0-9A-Za-z]{{1,{SHORT_LINK_MAX_LENGTH}}}$')
+CACHE_KEY = 'short_link:{code}'
+NOT_FOUND = 0
+
+
+def generate_code(length=SHORT_LINK_CODE_LENGTH):
+    """
+    Возвращает случайный base62-код.
+
+    Код из одних цифр не выдаётся: такие адреса /s/<id>/ заняты старыми
+    ссылками по id рецепта.
+    """
+    while True:
+        code = ''.join(
+            secrets.choice(BASE62_ALPHABET) for _ in range(length)
+        )
+        if not code.isdigit():
+            return code
+
+
+def create_short_links(recipe_ids, batch_size=1000):
+    """
+    Создаёт коды для рецептов, у которых их ещё нет.
+
+    Коды вставляются пакетами без сигналов, поэтому ключи новых кодов
+    сбрасываются в кэше явно. Рецепты, чей код совпал с уже занятым,
+    получают новый код в следующем проходе. Возвращает {id рецепта: код}.
+    """
+    recipe_ids = list(recipe_ids)
+    codes = dict(
+        ShortLink.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'code')
+    )
+    pending = [i for i in recipe_ids if i not in codes]
+    while pending:
+        ShortLink.objects.bulk_create(
+            (ShortLink(recipe_id=i, code=generate_code()) for i in pending),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        created = dict(
+            ShortLink.objects.filter(
+                recipe_id__in=pending
+            ).values_list('recipe_id', 'code')
+        )
+        cache.delete_many(
+            [CACHE_KEY.format(code=code) for code in created.values()]
+        )
+        codes.update(created)
+        pending = [i for i in pending if i not in codes]
+    return codes
+
+
+class ShortLinkResolver:
+    """
+    Находит рецепт по короткому коду.
+
+    Перед базой данных стоят два уровня: LRU в памяти процесса и общий
+    кэш. Связь кода с рецептом не меняется, поэтому популярные ссылки
+    обслуживаются из памяти; записи LRU живут local_timeout секунд, чтобы
+    удалённый рецепт перестал открываться во всех процессах. Коды
+    неверного формата отклоняются без обращений к кэшу, а отсутствующие
+    в базе на короткое время запоминаются в общем кэше.
+    """
+
+    def __init__(self, maxsize, timeout, local_timeout, missing_timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.missing_timeout = missing_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_local(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return None
+            recipe_id, expires = entry
+            if expires < time.monotonic():
+                del self._entries[code]
+                return None
+            self._entries.move_to_end(code)
+            return recipe_id
+
+    def _set_local(self, code, recipe_id):
+        with self._lock:
+            self._entries[code] = (
+                recipe_id, time.monotonic() + self.local_timeout
+            )
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resolve(self, code):
+        """Возвращает id рецепта по коду или None."""
+        if not CODE_RE.match(code):
+            return None
+        recipe_id = self._get_local(code)
+        if recipe_id is not None:
+            return recipe_id
+        key = CACHE_KEY.format(code=code)
+        recipe_id = cache.get(key)
+        if recipe_id is None:
+            recipe_id = ShortLink.objects.filter(
+                code=code
+            ).values_list('recipe_id', flat=True).first() or NOT_FOUND
+            cache.set(
+                key,
+                recipe_id,
+                self.timeout if recipe_id else self.missing_timeout
+            )
+        if recipe_id == NOT_FOUND:
+            return None
+        self._set_local(code, recipe_id)
+        return recipe_id
+
+    def forget(self, code):
+        """Удаляет код из кэшей (при создании или удалении ссылки)."""
+        cache.delete(CACHE_KEY.format(code=code))
+        with self._lock:
+            self._entries.pop(code, None)
+
+
+short_links = ShortLinkResolver(
+    maxsize=settings.SHORT_LINK_LRU_SIZE,
+    timeout=settings.SHORT_LINK_CACHE_TIMEOUT,
+    local_timeout=settings.SHORT_LINK_LOCAL_TIMEOUT,
+    missing_timeout=settings.SHORT_LINK_MISSING_TIMEOUT,
+)
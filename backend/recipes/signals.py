@@ -0,0 +1,188 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version_on_commit
+from .counters import change_counter
+from .feed import fan_out_recipe_on_commit, subscription_changed
+from .images import recipe_images, user_avatars
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShortLink, Subscription, Tag, User)
+from .pantry import log_recipe_change
+from .search import refresh_search_index_on_commit
+from .short_links import short_links
+from .trending import change_trending
+
+USER_PUBLIC_FIELDS = frozenset(
+    ['email', 'username', 'first_name', 'last_name', 'avatar']
+)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    """Инвалидирует кэш справочника при изменении тега или ингредиента."""
+    bump_version_on_commit(sender)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipe_changed(sender, **kwargs):
+    """Инвалидирует кэш рецептов при изменении рецепта или его состава."""
+    bump_version_on_commit(sender)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_search_changed(instance, **kwargs):
+    """Обновляет поисковый документ рецепта."""
+    refresh_search_index_on_commit([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipe_ingredient_search_changed(instance, **kwargs):
+    """Обновляет поисковый документ рецепта при изменении состава."""
+    refresh_search_index_on_commit([instance.recipe_id])
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_pantry_changed(instance, **kwargs):
+    """Отмечает рецепт для обновления индекса подбора по ингредиентам."""
+    log_recipe_change(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipe_ingredient_pantry_changed(instance, **kwargs):
+    """Отмечает рецепт с изменённым составом для индекса подбора."""
+    log_recipe_change(instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(instance, created, **kwargs):
+    """Обновляет документы рецептов с переименованным ингредиентом."""
+    if not created:
+        refresh_search_index_on_commit(
+            RecipeIngredient.objects.filter(
+                ingredient=instance
+            ).values_list('recipe_id', flat=True).distinct()
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(action, **kwargs):
+    """Инвалидирует кэш рецептов при изменении тегов рецепта."""
+    if action.startswith('post_'):
+        bump_version_on_commit(Recipe)
+
+
+@receiver(post_save, sender=User)
+def user_changed(update_fields=None, **kwargs):
+    """
+    Инвалидирует кэш рецептов при изменении публичных данных автора.
+
+    Служебные обновления (например, last_login при входе) кэш не сбрасывают.
+    """
+    if update_fields is None or USER_PUBLIC_FIELDS & set(update_fields):
+        bump_version_on_commit(User)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    """Инвалидирует кэш рецептов при удалении пользователя."""
+    bump_version_on_commit(sender)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(instance, **kwargs):
+    """Удаляет варианты изображения удалённого рецепта."""
+    recipe_images.delete_variants_on_commit(instance.image.name)
+
+
+@receiver(post_delete, sender=User)
+def user_avatar_deleted(instance, **kwargs):
+    """Удаляет варианты аватара удалённого пользователя."""
+    user_avatars.delete_variants_on_commit(instance.avatar.name)
+
+
+def _delta(signal, created=True):
+    """Возвращает изменение счётчика для сигнала сохранения/удаления."""
+    if signal is post_delete:
+        return -1
+    return 1 if created else 0
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def favorite_counter(signal, instance, created=True, **kwargs):
+    """Обновляет счётчик добавлений рецепта в избранное."""
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', delta)
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def shopping_cart_counter(signal, instance, created=True, **kwargs):
+    """Обновляет счётчик добавлений рецепта в корзину."""
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(
+            Recipe, instance.recipe_id, 'shopping_carts_count', delta
+        )
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def recipe_trending(sender, signal, instance, created=True, **kwargs):
+    """Обновляет балл популярности рецепта."""
+    delta = _delta(signal, created)
+    if delta:
+        change_trending(
+            sender, [(instance.recipe_id, instance.created_at)], delta
+        )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_counter(signal, instance, created=True, **kwargs):
+    """Обновляет счётчик рецептов автора."""
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(User, instance.author_id, 'recipes_count', delta)
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def subscription_counter(signal, instance, created=True, **kwargs):
+    """
+    Обновляет счётчики подписок и подписчиков и ленту подписчика.
+
+    Лента меняется после счётчиков, в том же обработчике: лимит рассылки
+    сравнивается с прочитанным заново числом подписчиков автора.
+    """
+    delta = _delta(signal, created)
+    if not delta:
+        return
+    change_counter(User, instance.user_id, 'subscriptions_count', delta)
+    change_counter(User, instance.author_id, 'subscribers_count', delta)
+    subscribers_count = User.objects.filter(
+        pk=instance.author_id
+    ).values_list('subscribers_count', flat=True).first()
+    if subscribers_count is not None:
+        subscription_changed(
+            instance.user_id, instance.author_id, subscribers_count,
+            added=delta > 0
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_feed_fan_out(instance, created, **kwargs):
+    """Рассылает новый рецепт по лентам подписчиков автора."""
+    if created:
+        fan_out_recipe_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ShortLink)
+def short_link_changed(instance, **kwargs):
+    """
+    Сбрасывает закэшированный результат поиска кода.
+
+    Нужен и при создании: код мог быть запомнен как отсутствующий.
+    """
+    code = instance.code
+    transaction.on_commit(lambda: short_links.forget(code))
@@ -0,0 +1,100 @@
+from array import array
+from itertools import repeat
+
+import numpy as np
+from scipy import sparse
+
+from .models import Favorite, RecipeSimilarity, ShoppingCart
+
+INTERACTION_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 0.5),
+)
+
+
+def load_interactions(batch_size):
+    """
+    Читает пары (пользователь, рецепт) избранного и корзин.
+
+    Строки выбираются потоком по batch_size и складываются в массивы
+    чисел (по 24 байта на связь), а не в список кортежей.
+    Возвращает массивы NumPy: пользователи, рецепты, веса.
+    """
+    users, recipes, weights = array('q'), array('q'), array('d')
+    for model, weight in INTERACTION_WEIGHTS:
+        rows = model.objects.order_by().values_list(
+            'user_id', 'recipe_id'
+        ).iterator(chunk_size=batch_size)
+        count = len(users)
+        for user_id, recipe_id in rows:
+            users.append(user_id)
+            recipes.append(recipe_id)
+        weights.extend(repeat(weight, len(users) - count))
+    return (
+        np.frombuffer(users, dtype=np.int64),
+        np.frombuffer(recipes, dtype=np.int64),
+        np.frombuffer(weights, dtype=np.float64),
+    )
+
+
+def build_matrix(users, recipes, weights):
+    """
+    Строит разреженную матрицу «рецепт × пользователь».
+
+    Веса повторных связей (рецепт и в избранном, и в корзине)
+    складываются. Строки нормированы, поэтому произведение строк двух
+    рецептов равно косинусной мере их сходства. Возвращает id рецептов
+    в порядке строк и матрицу CSR.
+    """
+    recipe_ids, recipe_rows = np.unique(recipes, return_inverse=True)
+    user_ids, user_columns = np.unique(users, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights, (recipe_rows, user_columns)),
+        shape=(len(recipe_ids), len(user_ids))
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return recipe_ids, (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def top_neighbours(rows, offset, limit):
+    """
+    Отбирает для строк блока сходства до limit соседей с наибольшей мерой.
+
+    rows — блок CSR (строки — рецепты offset, offset + 1, ...).
+    Сам рецепт в соседи не попадает. Возвращает (строка, соседи, меры).
+    """
+    for index in range(rows.shape[0]):
+        start, stop = rows.indptr[index], rows.indptr[index + 1]
+        columns = rows.indices[start:stop]
+        scores = rows.data[start:stop]
+        keep = columns != offset + index
+        columns, scores = columns[keep], scores[keep]
+        if len(scores) > limit:
+            best = np.argpartition(-scores, limit)[:limit]
+            columns, scores = columns[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        yield offset + index, columns[order], scores[order]
+
+
+def iter_similarity_blocks(recipe_ids, matrix, limit, chunk_size):
+    """
+    Вычисляет соседей рецептов блоками по chunk_size строк.
+
+    Блок сходства — произведение строк блока на транспонированную
+    матрицу, поэтому в памяти одновременно находится только один блок
+    размером не больше chunk_size × число рецептов. Для каждого блока
+    возвращает (обработано рецептов, несохранённые RecipeSimilarity).
+    """
+    recipe_ids = recipe_ids.tolist()
+    transposed = matrix.T.tocsr()
+    for offset in range(0, len(recipe_ids), chunk_size):
+        block = (matrix[offset:offset + chunk_size] @ transposed).tocsr()
+        yield min(offset + chunk_size, len(recipe_ids)), [
+            RecipeSimilarity(
+                recipe_id=recipe_ids[row],
+                similar_id=recipe_ids[column],
+                score=score
+            )
+            for row, columns, scores in top_neighbours(block, offset, limit)
+            for column, score in zip(columns.tolist(), scores.tolist())
+        ]
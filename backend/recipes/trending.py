@@ -0,0 +1,98 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart, TrendingEpoch
+
+TRENDING_WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 0.5,
+}
+EPOCH_PK = 1
+
+
+def get_epoch():
+    """Возвращает точку отсчёта баллов, создавая её при первом обращении."""
+    epoch, _ = TrendingEpoch.objects.get_or_create(
+        pk=EPOCH_PK, defaults={'started_at': timezone.now()}
+    )
+    return epoch
+
+
+def event_weight(weight, started_at, happened_at):
+    """
+    Вклад события в момент happened_at, выраженный в баллах точки отсчёта.
+
+    Вместо того чтобы уменьшать баллы всех рецептов со временем, вес
+    новых событий растёт вдвое за каждые TRENDING_HALF_LIFE секунд.
+    Отношение баллов двух рецептов от этого такое же, как при затухании,
+    поэтому сортировка по сохранённому столбцу (и его индексу) верна в
+    любой момент.
+    """
+    elapsed = (happened_at - started_at).total_seconds()
+    return weight * 2 ** (elapsed / settings.TRENDING_HALF_LIFE)
+
+
+def change_trending(related_model, relations, sign):
+    """
+    Изменяет баллы рецептов по связям модели related_model.
+
+    relations — пары (id рецепта, дата добавления связи); sign равен 1
+    для новых связей и -1 для удалённых. Удаление вычитает тот же вклад,
+    что был добавлен при создании связи, поэтому баллы остальных событий
+    рецепта не затрагиваются; балл не опускается ниже нуля (погрешность
+    округления). Выполняет один UPDATE.
+    """
+    weight = TRENDING_WEIGHTS.get(related_model)
+    if weight is None:
+        return
+    started_at = get_epoch().started_at
+    changes = defaultdict(float)
+    for recipe_id, created_at in relations:
+        changes[recipe_id] += sign * event_weight(
+            weight, started_at, created_at
+        )
+    if not changes:
+        return
+    Recipe.objects.filter(pk__in=changes).update(
+        trending_score=Greatest(
+            F('trending_score') + Case(
+                *(
+                    When(pk=recipe_id, then=Value(change))
+                    for recipe_id, change in changes.items()
+                ),
+                output_field=FloatField()
+            ),
+            0.0
+        )
+    )
+
+
+def renormalize_trending():
+    """
+    Переносит точку отсчёта на текущий момент.
+
+    Баллы умножаются на коэффициент затухания за прошедшее время и
+    становятся равны взвешенному числу событий на сейчас; без этого
+    веса событий росли бы неограниченно. Событие, записанное
+    параллельно с пересчётом, может получить вес старой точки отсчёта,
+    поэтому команду стоит запускать чаще периода полураспада (тогда
+    погрешность такого события меньше двукратной). Возвращает
+    коэффициент.
+    """
+    with transaction.atomic():
+        epoch = TrendingEpoch.objects.select_for_update().filter(
+            pk=EPOCH_PK
+        ).first() or get_epoch()
+        now = timezone.now()
+        factor = 1 / event_weight(1.0, epoch.started_at, now)
+        Recipe.objects.exclude(trending_score=0).update(
+            trending_score=F('trending_score') * factor
+        )
+        epoch.started_at = now
+        epoch.save(update_fields=['started_at'])
+    return factor
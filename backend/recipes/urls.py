@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import short_link_redirect
+from .views import recipe_id_redirect, short_link_redirect
 
 urlpatterns = [
-    path('<int:recipe_id>/', short_link_redirect, name='short-link'),
+    path('<int:recipe_id>/', recipe_id_redirect, name='recipe-id-link'),
+    path('<str:code>/', short_link_redirect, name='short-link'),
 ]
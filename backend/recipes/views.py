@@ -1,13 +1,22 @@
+from django.http import Http404
 from django.shortcuts import redirect
-from rest_framework.exceptions import ValidationError
 
 from recipes.models import Recipe
+from recipes.short_links import short_links
 
 
-def short_link_redirect(request, recipe_id):
+def short_link_redirect(request, code):
+    """Перенаправляет по короткому коду на страницу рецепта."""
+    recipe_id = short_links.resolve(code)
+    if recipe_id is None:
+        raise Http404
+
+    return redirect(f'/recipes/{recipe_id}')
+
+
+def recipe_id_redirect(request, recipe_id):
+    """Перенаправляет по старой ссылке вида /s/<id>/."""
     if not Recipe.objects.filter(pk=recipe_id).exists():
-        raise ValidationError(
-            f'Невозможно выполнить редирект: id={recipe_id} не найден.'
-        )
+        raise Http404
 
     return redirect(f'/recipes/{recipe_id}')
@@ -0,0 +1,181 @@
+import base64
+import io
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.feed import rebuild_feeds
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeSimilarity, ShoppingCart, Subscription, Tag,
+                            User)
+from recipes.pantry import pantry_index
+from recipes.search import refresh_search_index
+from recipes.short_links import create_short_links
+from recipes.similarity import (build_matrix, iter_similarity_blocks,
+                                load_interactions)
+
+PASSWORD = 'budget-password-1'
+
+
+def make_image():
+    """Маленькое PNG-изображение в виде base64-строки."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(settings, tmp_path):
+    """
+    Отключает кэши и пишет файлы во временный каталог.
+
+    Без кэша каждый запрос доходит до базы данных, поэтому считаются
+    запросы самой выдачи, а не попадания в кэш.
+    """
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }
+    }
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Включает настоящий кэш в памяти процесса вместо DummyCache."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tests',
+        }
+    }
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def image():
+    return make_image()
+
+
+@pytest.fixture
+def client_for():
+    """Возвращает клиент API, авторизованный под пользователем."""
+    def make_client(user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+    return make_client
+
+
+@pytest.fixture
+def seed(db):
+    """
+    Заполняет базу данными размера size.
+
+    size авторов, тегов и ингредиентов и size × size рецептов, в каждом
+    все ингредиенты. Пользователь viewer подписан на всех авторов и
+    добавил все их рецепты в избранное и корзину; у него есть свой
+    рецепт own с одним тегом и одним ингредиентом, который все авторы
+    добавили в избранное и корзину. Пользователь other ни с чем
+    не связан. Объекты разных вызовов не пересекаются, поэтому в одном
+    тесте можно создать данные нескольких размеров.
+    """
+    def make_data(size):
+        prefix = f's{size}'
+        viewer = User.objects.create_user(
+            email=f'{prefix}-viewer@example.com',
+            username=f'{prefix}-viewer',
+            first_name='Проверка', last_name='Бюджета',
+            password=PASSWORD, is_staff=True, is_superuser=True
+        )
+        other = User.objects.create_user(
+            email=f'{prefix}-other@example.com', username=f'{prefix}-other',
+            first_name='Другой', last_name='Пользователь',
+            password=PASSWORD
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'{prefix}-author{i}@example.com',
+                username=f'{prefix}-author{i}',
+                first_name='Автор', last_name=str(i)
+            )
+            for i in range(size)
+        ]
+        tags = [
+            Tag.objects.create(name=f'{prefix} тег {i}', slug=f'{prefix}-{i}')
+            for i in range(size)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'{prefix} ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(size)
+        ]
+
+        def create_recipe(author, number, tags=tags[:2],
+                          ingredients=ingredients):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'{prefix} рецепт {number}',
+                text='Описание',
+                cooking_time=number + 1,
+                image='recipes/budget.png'
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients
+            )
+            return recipe
+
+        for author in authors:
+            Subscription.objects.create(user=viewer, author=author)
+        recipes = [
+            create_recipe(authors[i % size], i) for i in range(size * size)
+        ]
+        for recipe in recipes:
+            Favorite.objects.create(user=viewer, recipe=recipe)
+            ShoppingCart.objects.create(user=viewer, recipe=recipe)
+        own = create_recipe(
+            viewer, size * size, tags=tags[:1], ingredients=ingredients[:1]
+        )
+        for author in authors:
+            Favorite.objects.create(user=author, recipe=own)
+            ShoppingCart.objects.create(user=author, recipe=own)
+        create_short_links([recipe.pk for recipe in recipes])
+
+        # Обработчики on_commit в тестовой транзакции не выполняются,
+        # поэтому производные данные строятся явно.
+        rebuild_feeds()
+        refresh_search_index()
+        pantry_index.rebuild()
+        RecipeSimilarity.objects.all().delete()
+        for _, similarities in iter_similarity_blocks(
+            *build_matrix(*load_interactions(batch_size=1000)),
+            limit=size, chunk_size=size
+        ):
+            RecipeSimilarity.objects.bulk_create(similarities)
+        return SimpleNamespace(
+            size=size,
+            prefix=prefix,
+            viewer=viewer,
+            other=other,
+            authors=authors,
+            tags=tags,
+            ingredients=ingredients,
+            recipes=recipes,
+            recipe=recipes[-1],
+            own=own,
+        )
+    return make_data
@@ -0,0 +1,42 @@
+"""
+Бюджет SQL-запросов списков админки.
+
+Список объектов открывается на данных двух размеров (SIZES); число
+запросов не должно превышать бюджет и зависеть от числа строк.
+"""
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+SIZES = (2, 6)
+
+CHANGELIST_BUDGETS = {
+    'recipe': 11,
+    'user': 5,
+    'tag': 5,
+    'ingredient': 6,
+    'recipeingredient': 5,
+    'favorite': 5,
+    'shoppingcart': 5,
+    'shortlink': 5,
+    'subscription': 5,
+}
+
+
+@pytest.mark.parametrize('model_name', CHANGELIST_BUDGETS)
+def test_changelist_queries(model_name, seed,
+                            django_assert_max_num_queries):
+    budget = CHANGELIST_BUDGETS[model_name]
+    url = reverse(f'admin:recipes_{model_name}_changelist')
+    counts = []
+    for size in SIZES:
+        data = seed(size)
+        client = Client()
+        client.force_login(data.viewer)
+        with django_assert_max_num_queries(budget) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(queries))
+    assert len(set(counts)) == 1, (
+        f'число запросов зависит от размера данных: {counts}'
+    )
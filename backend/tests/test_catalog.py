@@ -0,0 +1,53 @@
+"""Справочники тегов и ингредиентов с ETag."""
+import pytest
+
+from recipes.models import Tag
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.mark.parametrize('url', ['/api/tags/', '/api/ingredients/'])
+def test_not_modified(seed, client_for, django_assert_num_queries, url):
+    seed(2)
+    client = client_for(None)
+    response = client.get(url)
+    etag = response['ETag']
+    assert response.status_code == 200
+    assert len(response.data) == 2
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert client.get(
+        url, HTTP_IF_NONE_MATCH=f'"other", {etag}'
+    ).status_code == 304
+    assert client.get(url, HTTP_IF_NONE_MATCH='*').status_code == 304
+    assert client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+def test_change_invalidates_etag(
+    seed, client_for, django_capture_on_commit_callbacks
+):
+    seed(2)
+    client = client_for(None)
+    etag = client.get('/api/tags/')['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Новый тег', slug='new')
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'new' in [tag['slug'] for tag in response.data]
+
+
+def test_filtered_request_bypasses_catalog(seed, client_for):
+    data = seed(2)
+    response = client_for(None).get(
+        '/api/ingredients/', {'name': data.ingredients[1].name}
+    )
+    assert response.status_code == 200
+    assert 'ETag' not in response
+    assert [item['id'] for item in response.data] == [
+        data.ingredients[1].pk
+    ]
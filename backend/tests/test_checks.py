@@ -0,0 +1,44 @@
+"""Системные проверки настроек."""
+import pytest
+
+from recipes.checks import shared_cache_check
+
+MEMCACHED = 'django.core.cache.backends.memcached.PyMemcacheCache'
+
+
+@pytest.mark.parametrize('backend', [
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+])
+def test_process_local_cache_rejected(settings, backend):
+    settings.DEBUG = False
+    settings.CACHES = {'default': {'BACKEND': backend}}
+    assert [error.id for error in shared_cache_check(None)] == [
+        'recipes.E001'
+    ]
+
+    settings.DEBUG = True
+    assert shared_cache_check(None) == []
+
+
+def test_shared_cache_accepted(settings):
+    settings.DEBUG = False
+    settings.CACHES = {
+        'default': {'BACKEND': MEMCACHED, 'LOCATION': 'memcached:11211'}
+    }
+    assert shared_cache_check(None) == []
+
+
+def test_response_cache_alias_checked(settings):
+    settings.DEBUG = False
+    settings.RESPONSE_CACHE_ALIAS = 'responses'
+    settings.CACHES = {
+        'default': {'BACKEND': MEMCACHED, 'LOCATION': 'memcached:11211'},
+        'responses': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        },
+    }
+    errors = shared_cache_check(None)
+    assert len(errors) == 1
+    assert "'responses'" in errors[0].msg
@@ -0,0 +1,59 @@
+"""Группы времени готовки в админке рецептов."""
+import pytest
+from django.test import Client
+
+from recipes.cooking_time import CookingTimeBucket, get_cooking_time_buckets
+from recipes.filters import CookingTimeFilter
+from recipes.models import Recipe
+
+
+def test_buckets(seed):
+    seed(2)
+    assert get_cooking_time_buckets() == (
+        CookingTimeBucket('fast', 1, 2, 2),
+        CookingTimeBucket('medium', 3, 4, 2),
+        CookingTimeBucket('slow', 5, 5, 1),
+    )
+
+
+def test_too_few_distinct_times(seed):
+    seed(2)
+    Recipe.objects.update(cooking_time=10)
+    assert get_cooking_time_buckets() == ()
+
+
+@pytest.mark.usefixtures('locmem_cache')
+def test_buckets_recalculated_after_change(
+    seed, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    get_cooking_time_buckets()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        data.own.cooking_time = 10
+        data.own.save()
+    assert get_cooking_time_buckets() == (
+        CookingTimeBucket('fast', 1, 2, 2),
+        CookingTimeBucket('medium', 3, 4, 2),
+        CookingTimeBucket('slow', 5, 10, 1),
+    )
+
+
+def test_admin_filter(seed):
+    data = seed(2)
+    client = Client()
+    client.force_login(data.viewer)
+
+    response = client.get('/admin/recipes/recipe/')
+    choices = [
+        choice['display']
+        for spec in response.context['cl'].filter_specs
+        if isinstance(spec, CookingTimeFilter)
+        for choice in spec.choices(response.context['cl'])
+    ]
+    assert choices[1:] == [
+        'Быстрее 2 мин (2)', '2-4 мин (2)', 'Дольше 4 мин (1)'
+    ]
+
+    response = client.get('/admin/recipes/recipe/?cooking_time_range=slow')
+    assert list(response.context['cl'].result_list) == [data.own]
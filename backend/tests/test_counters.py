@@ -0,0 +1,256 @@
+"""Денормализованные счётчики рецептов и пользователей."""
+import io
+import threading
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscription, User
+
+
+def recipe_counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.shopping_carts_count
+
+
+def user_counters(user):
+    user.refresh_from_db()
+    return (
+        user.recipes_count, user.subscriptions_count, user.subscribers_count
+    )
+
+
+def test_seed_counters(seed):
+    data = seed(2)
+    assert recipe_counters(data.recipe) == (1, 1)
+    assert recipe_counters(data.own) == (2, 2)
+    assert user_counters(data.viewer) == (1, 2, 0)
+    assert user_counters(data.authors[0]) == (2, 0, 1)
+
+
+def test_favorite_and_shopping_cart(seed, client_for):
+    data = seed(2)
+    client = client_for(data.other)
+    url = f'/api/recipes/{data.recipe.pk}'
+
+    assert client.post(f'{url}/favorite/').status_code == 201
+    assert client.post(f'{url}/favorite/').status_code == 400
+    assert client.post(f'{url}/shopping_cart/').status_code == 201
+    assert recipe_counters(data.recipe) == (2, 2)
+
+    assert client.delete(f'{url}/favorite/').status_code == 204
+    assert client.delete(f'{url}/favorite/').status_code == 404
+    assert client.delete(f'{url}/shopping_cart/').status_code == 204
+    assert recipe_counters(data.recipe) == (1, 1)
+
+
+def test_bulk_favorite(seed, client_for):
+    data = seed(2)
+    client = client_for(data.other)
+    first, second = data.recipes[:2]
+    Favorite.objects.create(user=data.other, recipe=first)
+
+    missing = data.own.pk + 1000
+    response = client.post(
+        '/api/recipes/favorite/',
+        {'recipes': [first.pk, second.pk, missing]},
+        format='json'
+    )
+    assert response.status_code == 201
+    assert [item['status'] for item in response.data['results']] == [
+        'already_added', 'added', 'not_found'
+    ]
+    assert recipe_counters(first) == (2, 1)
+    assert recipe_counters(second) == (2, 1)
+
+    response = client.post(
+        '/api/recipes/favorite/', {'recipes': [second.pk]}, format='json'
+    )
+    assert response.status_code == 200
+    assert recipe_counters(second) == (2, 1)
+
+    response = client.delete(
+        '/api/recipes/favorite/',
+        {'recipes': [first.pk, second.pk, data.own.pk]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert [item['status'] for item in response.data['results']] == [
+        'deleted', 'deleted', 'not_in_list'
+    ]
+    assert recipe_counters(first) == (1, 1)
+    assert recipe_counters(second) == (1, 1)
+    assert recipe_counters(data.own) == (2, 2)
+
+
+def test_bulk_shopping_cart(seed, client_for):
+    data = seed(2)
+    client = client_for(data.other)
+    recipe_ids = [recipe.pk for recipe in data.recipes]
+
+    response = client.post(
+        '/api/recipes/shopping_cart/', {'recipes': recipe_ids}, format='json'
+    )
+    assert response.status_code == 201
+    assert all(
+        recipe_counters(recipe) == (1, 2) for recipe in data.recipes
+    )
+
+    response = client.delete(
+        '/api/recipes/shopping_cart/', {'recipes': recipe_ids}, format='json'
+    )
+    assert response.status_code == 200
+    assert all(
+        recipe_counters(recipe) == (1, 1) for recipe in data.recipes
+    )
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='SQLite выполняет записывающие транзакции по очереди'
+)
+def test_concurrent_bulk_add_counted_once(
+    transactional_db, seed, client_for
+):
+    data = seed(2)
+    recipe_ids = [recipe.pk for recipe in data.recipes]
+    barrier = threading.Barrier(2)
+
+    def add():
+        try:
+            barrier.wait()
+            client_for(data.other).post(
+                '/api/recipes/favorite/', {'recipes': recipe_ids},
+                format='json'
+            )
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=add) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(
+        recipe_counters(recipe) == (2, 1) for recipe in data.recipes
+    )
+
+
+def test_recipe_create_and_delete(seed, client_for, image):
+    data = seed(2)
+    client = client_for(data.viewer)
+    response = client.post('/api/recipes/', {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': image,
+        'tags': [data.tags[0].pk],
+        'ingredients': [{'id': data.ingredients[0].pk, 'amount': 1}],
+    }, format='json')
+    assert response.status_code == 201
+    assert user_counters(data.viewer)[0] == 2
+
+    response = client.delete(f'/api/recipes/{data.own.pk}/')
+    assert response.status_code == 204
+    assert user_counters(data.viewer)[0] == 1
+    assert not Favorite.objects.filter(recipe_id=data.own.pk).exists()
+    assert not ShoppingCart.objects.filter(recipe_id=data.own.pk).exists()
+
+
+def test_subscribe(seed, client_for):
+    data = seed(2)
+    author = data.authors[0]
+    client = client_for(data.other)
+
+    response = client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 201
+    assert user_counters(data.other) == (0, 1, 0)
+    assert user_counters(author) == (2, 0, 2)
+
+    response = client.delete(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 204
+    assert user_counters(data.other) == (0, 0, 0)
+    assert user_counters(author) == (2, 0, 1)
+
+
+def test_save_keeps_concurrent_increments(seed):
+    data = seed(2)
+    recipe = Recipe.objects.get(pk=data.recipe.pk)
+    user = User.objects.get(pk=data.other.pk)
+
+    Favorite.objects.create(user=data.other, recipe=data.recipe)
+    Subscription.objects.create(user=data.other, author=data.viewer)
+    recipe.name = 'Переименованный рецепт'
+    recipe.save()
+    user.first_name = 'Переименованный'
+    user.save()
+
+    assert recipe_counters(recipe) == (2, 1)
+    assert recipe.name == 'Переименованный рецепт'
+    assert user_counters(user) == (0, 1, 0)
+    assert user.first_name == 'Переименованный'
+
+
+def test_recipe_update_keeps_counters(seed, client_for, image):
+    data = seed(2)
+    response = client_for(data.viewer).patch(
+        f'/api/recipes/{data.own.pk}/', {
+            'name': 'Новое название',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': image,
+            'tags': [data.tags[0].pk],
+            'ingredients': [{'id': data.ingredients[0].pk, 'amount': 3}],
+        }, format='json'
+    )
+    assert response.status_code == 200
+    assert recipe_counters(data.own) == (2, 2)
+
+
+def test_admin_author_change_moves_recipe_count(seed):
+    data = seed(2)
+    recipe = data.recipes[0]
+    old_author, new_author = recipe.author, data.other
+    client = Client()
+    client.force_login(data.viewer)
+
+    recipe_ingredients = list(recipe.recipe_ingredients.all())
+    form = {
+        'name': recipe.name,
+        'author': new_author.pk,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': [tag.pk for tag in recipe.tags.all()],
+        'recipe_ingredients-TOTAL_FORMS': len(recipe_ingredients),
+        'recipe_ingredients-INITIAL_FORMS': len(recipe_ingredients),
+    }
+    for number, recipe_ingredient in enumerate(recipe_ingredients):
+        prefix = f'recipe_ingredients-{number}'
+        form[f'{prefix}-id'] = recipe_ingredient.pk
+        form[f'{prefix}-recipe'] = recipe.pk
+        form[f'{prefix}-ingredient'] = recipe_ingredient.ingredient_id
+        form[f'{prefix}-amount'] = recipe_ingredient.amount
+
+    response = client.post(
+        f'/admin/recipes/recipe/{recipe.pk}/change/', form
+    )
+    assert response.status_code == 302
+    assert user_counters(old_author)[0] == 1
+    assert user_counters(new_author)[0] == 1
+    assert recipe_counters(recipe) == (1, 1)
+
+
+def test_reconcile_counters(seed):
+    data = seed(2)
+    Recipe.objects.filter(pk=data.recipe.pk).update(
+        favorites_count=10, shopping_carts_count=0
+    )
+    User.objects.filter(pk=data.viewer.pk).update(recipes_count=5)
+
+    call_command('reconcile_counters', batch_size=1, stdout=io.StringIO())
+
+    assert recipe_counters(data.recipe) == (1, 1)
+    assert user_counters(data.viewer) == (1, 2, 0)
@@ -0,0 +1,106 @@
+"""Лента рецептов авторов из подписок."""
+import pytest
+
+from recipes.models import FeedEntry
+
+FEED_URL = '/api/users/subscriptions/feed/'
+
+
+def feed(client, limit=100):
+    ids, url, params = [], FEED_URL, {'limit': limit}
+    while url:
+        response = client.get(url, params)
+        assert response.status_code == 200
+        ids.extend(item['id'] for item in response.data['results'])
+        url, params = response.data['next'], None
+    return ids
+
+
+def newest_first(recipes):
+    return [
+        recipe.pk for recipe in sorted(
+            recipes,
+            key=lambda recipe: (recipe.created_at, recipe.pk),
+            reverse=True
+        )
+    ]
+
+
+@pytest.fixture
+def on_commit(django_capture_on_commit_callbacks):
+    """Выполняет обработчики on_commit сразу после действия."""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+def publish(client, data, image):
+    response = client.post('/api/recipes/', {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': image,
+        'tags': [data.tags[0].pk],
+        'ingredients': [{'id': data.ingredients[0].pk, 'amount': 1}],
+    }, format='json')
+    assert response.status_code == 201
+    return response.data['id']
+
+
+def test_feed_contents(seed, client_for):
+    data = seed(3)
+    client = client_for(data.viewer)
+
+    assert feed(client) == newest_first(data.recipes)
+    assert feed(client, limit=2) == newest_first(data.recipes)
+    assert feed(client_for(data.other)) == []
+
+
+def test_requires_authentication(client_for):
+    assert client_for(None).get(FEED_URL).status_code == 401
+
+
+def test_subscribe_publish_unsubscribe(seed, client_for, image, on_commit):
+    data = seed(2)
+    author = data.authors[0]
+    reader = client_for(data.other)
+    author_recipes = [
+        recipe for recipe in data.recipes if recipe.author == author
+    ]
+
+    with on_commit():
+        reader.post(f'/api/users/{author.pk}/subscribe/')
+    assert feed(reader) == newest_first(author_recipes)
+
+    with on_commit():
+        recipe_id = publish(client_for(author), data, image)
+    assert feed(reader) == [recipe_id, *newest_first(author_recipes)]
+    assert feed(client_for(data.viewer))[0] == recipe_id
+
+    with on_commit():
+        reader.delete(f'/api/users/{author.pk}/subscribe/')
+    assert feed(reader) == []
+
+
+def test_fan_out_limit(seed, client_for, image, on_commit, settings):
+    settings.FEED_FANOUT_LIMIT = 1
+    data = seed(2)
+    author = data.authors[0]
+    viewer = client_for(data.viewer)
+    reader = client_for(data.other)
+
+    with on_commit():
+        reader.post(f'/api/users/{author.pk}/subscribe/')
+    assert not FeedEntry.objects.filter(user=data.other).exists()
+
+    with on_commit():
+        recipe_id = publish(client_for(author), data, image)
+    assert not FeedEntry.objects.filter(recipe_id=recipe_id).exists()
+    assert feed(reader)[0] == recipe_id
+    assert feed(viewer)[0] == recipe_id
+
+    with on_commit():
+        reader.delete(f'/api/users/{author.pk}/subscribe/')
+    assert FeedEntry.objects.filter(
+        user=data.viewer, recipe_id=recipe_id
+    ).exists()
+    assert feed(viewer)[0] == recipe_id
+    assert feed(reader) == []
@@ -0,0 +1,80 @@
+"""Построение вариантов изображений."""
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from recipes.images import recipe_images
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+def process_images():
+    stderr = io.StringIO()
+    call_command(
+        'process_images', workers=0, stdout=io.StringIO(), stderr=stderr
+    )
+    return stderr.getvalue()
+
+
+@pytest.fixture
+def recipes(seed, settings):
+    """
+    Изображение рецепта own есть в хранилище, у остальных рецептов
+    файлов нет, и обработать их нельзя.
+    """
+    settings.IMAGE_MAX_ATTEMPTS = 2
+    data = seed(2)
+    data.own.image.save('own.png', png())
+    return data
+
+
+def pending_ids():
+    return set(recipe_images.pending().values_list('pk', flat=True))
+
+
+def test_variants_built(recipes):
+    process_images()
+
+    recipes.own.refresh_from_db()
+    assert recipe_images.is_ready(recipes.own)
+    assert all(
+        recipe_images.storage.exists(
+            recipe_images.variant_name(recipes.own.image.name, name, 'webp')
+        )
+        for name in ('thumbnail', 'card', 'full')
+    )
+    assert recipes.own.pk not in pending_ids()
+
+
+def test_failed_images_skipped_after_max_attempts(recipes):
+    broken = {recipe.pk for recipe in recipes.recipes}
+
+    errors = process_images()
+    assert errors.count('\n') == len(broken)
+    assert pending_ids() == broken
+
+    errors = process_images()
+    assert errors.count('пропущено после 2 попыток') == len(broken)
+    assert pending_ids() == set()
+    assert process_images() == ''
+
+
+def test_replaced_image_retried(recipes):
+    process_images()
+    process_images()
+    recipe = recipes.recipes[0]
+
+    recipe.image.save('replaced.png', png())
+    assert pending_ids() == {recipe.pk}
+    process_images()
+    recipe.refresh_from_db()
+    assert recipe_images.is_ready(recipe)
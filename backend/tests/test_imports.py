@@ -0,0 +1,134 @@
+"""Загрузка тегов и ингредиентов из файлов."""
+import io
+import json
+import re
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+
+from recipes.imports import ImportConflictError, import_items
+from recipes.models import Ingredient, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+def load(command, path, **options):
+    stdout = io.StringIO()
+    call_command(command, file=str(path), stdout=stdout, **options)
+    return tuple(map(int, re.search(
+        r'добавлено (\d+), обновлено (\d+), пропущено (\d+) из (\d+)',
+        stdout.getvalue()
+    ).groups()))
+
+
+def write_json(path, items):
+    path.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def tags():
+    return dict(Tag.objects.values_list('slug', 'name'))
+
+
+def test_tags_upsert(tmp_path):
+    path = tmp_path / 'tags.json'
+    write_json(path, [
+        {'slug': 'breakfast', 'name': 'Завтрак'},
+        {'slug': 'lunch', 'name': 'Обед'},
+    ])
+    assert load('load_tags', path) == (2, 0, 0, 2)
+    assert load('load_tags', path) == (0, 0, 2, 2)
+
+    write_json(path, [
+        {'slug': 'breakfast', 'name': 'Ранний завтрак'},
+        {'slug': 'lunch', 'name': 'Обед'},
+        {'slug': 'dinner', 'name': 'Ужин'},
+        {'slug': 'dinner', 'name': 'Поздний ужин'},
+        {'slug': '', 'name': 'Без идентификатора'},
+    ])
+    assert load('load_tags', path, batch_size=2) == (1, 1, 3, 5)
+    assert tags() == {
+        'breakfast': 'Ранний завтрак', 'lunch': 'Обед',
+        'dinner': 'Поздний ужин'
+    }
+
+
+def test_ingredients_csv_and_ndjson(tmp_path):
+    csv_path = tmp_path / 'ingredients.csv'
+    csv_path.write_text(
+        'name,measurement_unit\n'
+        'соль,г\n'
+        'молоко,мл\n'
+        'лишний,столбец,здесь\n',
+        encoding='utf-8'
+    )
+    assert load('load_ingredients', csv_path) == (2, 0, 1, 3)
+
+    ndjson_path = tmp_path / 'ingredients.ndjson'
+    ndjson_path.write_text(
+        '{"name": "соль", "measurement_unit": "г"}\n'
+        '\n'
+        '{"name": "молоко", "measurement_unit": "л"}\n',
+        encoding='utf-8'
+    )
+    assert load('load_ingredients', ndjson_path) == (0, 1, 1, 2)
+    assert set(
+        Ingredient.objects.values_list('name', 'measurement_unit')
+    ) == {('соль', 'г'), ('молоко', 'л')}
+
+
+def test_swapped_names_conflict(tmp_path):
+    Tag.objects.create(slug='breakfast', name='Завтрак')
+    Tag.objects.create(slug='lunch', name='Обед')
+    path = write_json(tmp_path / 'tags.json', [
+        {'slug': 'breakfast', 'name': 'Обед'},
+        {'slug': 'lunch', 'name': 'Завтрак'},
+        {'slug': 'dinner', 'name': 'Ужин'},
+    ])
+
+    with pytest.raises(CommandError) as error:
+        load('load_tags', path)
+    assert 'breakfast, lunch' in str(error.value)
+    assert tags() == {'breakfast': 'Завтрак', 'lunch': 'Обед'}
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'tags.json'
+    path.write_text('[{"slug": "a", "name": "А"}', encoding='utf-8')
+    with pytest.raises(CommandError, match='Ошибка разбора'):
+        load('load_tags', path)
+    assert tags() == {}
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql', reason='COPY есть только в PostgreSQL'
+)
+def test_copy_upsert():
+    Tag.objects.create(slug='breakfast', name='Завтрак')
+    Tag.objects.create(slug='lunch', name='Обед')
+
+    def copy(items):
+        with transaction.atomic(), connection.cursor() as cursor:
+            return import_items(
+                Tag, ('slug', 'name'), items, batch_size=2, cursor=cursor
+            )
+
+    stats = copy([
+        {'slug': 'breakfast', 'name': 'Завтрак'},
+        {'slug': 'lunch', 'name': 'Поздний обед'},
+        {'slug': 'dinner', 'name': 'Ужин'},
+    ])
+    assert (stats['inserted'], stats['updated'], stats['skipped']) == (
+        1, 1, 1
+    )
+    assert tags() == {
+        'breakfast': 'Завтрак', 'lunch': 'Поздний обед', 'dinner': 'Ужин'
+    }
+
+    with pytest.raises(ImportConflictError, match='breakfast, lunch'):
+        copy([
+            {'slug': 'breakfast', 'name': 'Поздний обед'},
+            {'slug': 'lunch', 'name': 'Завтрак'},
+        ])
+    assert tags()['breakfast'] == 'Завтрак'
@@ -0,0 +1,107 @@
+"""Подбор рецептов по имеющимся ингредиентам."""
+import pytest
+
+
+def match(client, *ingredients, **params):
+    response = client.get('/api/recipes/by_ingredients/', {
+        'ingredients': ','.join(str(item.pk) for item in ingredients),
+        'limit': 100,
+        **params
+    })
+    assert response.status_code == 200
+    return [
+        (item['id'], item['matched_count'], item['missing_count'])
+        for item in response.data['results']
+    ]
+
+
+def newest_first(recipes):
+    return sorted(recipes, key=lambda recipe: recipe.pk, reverse=True)
+
+
+def test_fewest_missing_first(seed, client_for):
+    data = seed(3)
+    first, second, third = data.ingredients
+    client = client_for(None)
+
+    assert match(client, first, second) == [(data.own.pk, 1, 0)] + [
+        (recipe.pk, 2, 1) for recipe in newest_first(data.recipes)
+    ]
+    assert match(client, first, second, third) == [
+        (recipe.pk, 3, 0) for recipe in newest_first(data.recipes)
+    ] + [(data.own.pk, 1, 0)]
+    assert match(client, third) == [
+        (recipe.pk, 1, 2) for recipe in newest_first(data.recipes)
+    ]
+
+
+def test_pagination(seed, client_for):
+    data = seed(3)
+    first, second, _ = data.ingredients
+    client = client_for(None)
+
+    response = client.get('/api/recipes/by_ingredients/', {
+        'ingredients': f'{first.pk},{second.pk}', 'limit': 4, 'page': 2
+    })
+    assert response.data['count'] == len(data.recipes) + 1
+    assert [item['id'] for item in response.data['results']] == [
+        recipe.pk for recipe in newest_first(data.recipes)[3:7]
+    ]
+
+
+def test_unknown_ingredients(seed, client_for):
+    data = seed(2)
+    response = client_for(None).get(
+        '/api/recipes/by_ingredients/',
+        {'ingredients': data.ingredients[-1].pk + 1000}
+    )
+    assert response.status_code == 200
+    assert response.data['count'] == 0
+
+
+@pytest.mark.parametrize('ingredients', ['', 'abc', '0'])
+def test_invalid_query(seed, client_for, ingredients):
+    seed(2)
+    response = client_for(None).get(
+        '/api/recipes/by_ingredients/', {'ingredients': ingredients}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures('locmem_cache')
+def test_recipe_changes_applied(
+    seed, client_for, image, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    first, second = data.ingredients
+    anonymous = client_for(None)
+    author = client_for(data.other)
+    match(anonymous, first)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author.post('/api/recipes/', {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': image,
+            'tags': [data.tags[0].pk],
+            'ingredients': [{'id': second.pk, 'amount': 1}],
+        }, format='json')
+    recipe_id = response.data['id']
+    assert match(anonymous, second)[0] == (recipe_id, 1, 0)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.patch(f'/api/recipes/{recipe_id}/', {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': image,
+            'tags': [data.tags[0].pk],
+            'ingredients': [{'id': first.pk, 'amount': 1}],
+        }, format='json')
+    assert recipe_id not in [item[0] for item in match(anonymous, second)]
+    assert match(anonymous, first)[0] == (recipe_id, 1, 0)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.delete(f'/api/recipes/{recipe_id}/')
+    assert recipe_id not in [item[0] for item in match(anonymous, first)]
@@ -0,0 +1,270 @@
+"""
+Бюджет SQL-запросов маршрутов API.
+
+Каждый маршрут выполняется на данных двух размеров (SIZES). Тест падает,
+если число запросов превышает бюджет или отличается между размерами,
+то есть растёт вместе с данными (N+1).
+"""
+from collections import namedtuple
+
+import pytest
+from django.urls import URLPattern, URLResolver
+from rest_framework.authtoken.models import Token
+
+from api import urls
+from tests.conftest import PASSWORD
+
+SIZES = (2, 6)
+
+Case = namedtuple(
+    'Case', ['route', 'method', 'path', 'user', 'status', 'budget', 'body']
+)
+
+
+def case(route, method, path, user, status, budget, body=None):
+    return Case(route, method, path, user, status, budget, body)
+
+
+def recipe_body(data, image):
+    return {
+        'name': f'{data.prefix} новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': image,
+        'tags': [tag.pk for tag in data.tags],
+        'ingredients': [
+            {'id': ingredient.pk, 'amount': 2}
+            for ingredient in data.ingredients
+        ],
+    }
+
+
+def all_recipes(data, image):
+    return {'recipes': [recipe.pk for recipe in data.recipes]}
+
+
+CASES = [
+    case('api-root', 'get', lambda d: '/api/', None, 200, 0),
+
+    case('login', 'post', lambda d: '/api/auth/token/login/', None, 200, 6,
+         lambda d, i: {'email': d.other.email, 'password': PASSWORD}),
+    case('logout', 'post', lambda d: '/api/auth/token/logout/',
+         'other', 204, 1),
+
+    case('recipes-list', 'get', lambda d: f'/api/recipes/?limit={d.size}',
+         'viewer', 200, 6),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&tags={d.prefix}-0,'
+                   f'{d.prefix}-1',
+         'viewer', 200, 6),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&search=рецепт',
+         'viewer', 200, 6),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&pagination=cursor',
+         'viewer', 200, 5),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&ordering=-trending',
+         'viewer', 200, 6),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&is_favorited=1'
+                   f'&is_in_shopping_cart=1',
+         'viewer', 200, 6),
+    case('recipes-list', 'get',
+         lambda d: f'/api/recipes/?limit={d.size}&author={d.authors[0].pk}',
+         None, 200, 5),
+    case('recipes-list', 'post', lambda d: '/api/recipes/',
+         'viewer', 201, 16, recipe_body),
+    case('recipes-detail', 'get', lambda d: f'/api/recipes/{d.recipe.pk}/',
+         'viewer', 200, 5),
+    case('recipes-detail', 'patch', lambda d: f'/api/recipes/{d.own.pk}/',
+         'viewer', 200, 18, recipe_body),
+    case('recipes-detail', 'delete', lambda d: f'/api/recipes/{d.own.pk}/',
+         'viewer', 204, 18),
+    case('recipes-favorite', 'post',
+         lambda d: f'/api/recipes/{d.own.pk}/favorite/', 'viewer', 201, 11),
+    case('recipes-favorite', 'delete',
+         lambda d: f'/api/recipes/{d.recipe.pk}/favorite/', 'viewer', 204, 8),
+    case('recipes-shopping-cart', 'post',
+         lambda d: f'/api/recipes/{d.own.pk}/shopping_cart/',
+         'viewer', 201, 11),
+    case('recipes-shopping-cart', 'delete',
+         lambda d: f'/api/recipes/{d.recipe.pk}/shopping_cart/',
+         'viewer', 204, 8),
+    case('recipes-favorite-bulk', 'post', lambda d: '/api/recipes/favorite/',
+         'other', 201, 10, all_recipes),
+    case('recipes-favorite-bulk', 'delete',
+         lambda d: '/api/recipes/favorite/', 'viewer', 200, 9, all_recipes),
+    case('recipes-shopping-cart-bulk', 'post',
+         lambda d: '/api/recipes/shopping_cart/', 'other', 201, 10,
+         all_recipes),
+    case('recipes-shopping-cart-bulk', 'delete',
+         lambda d: '/api/recipes/shopping_cart/', 'viewer', 200, 9,
+         all_recipes),
+    case('recipes-by-ingredients', 'get',
+         lambda d: '/api/recipes/by_ingredients/?ingredients='
+                   f'{d.ingredients[0].pk}&limit={d.size}',
+         'viewer', 200, 6),
+    case('recipes-download-shopping-cart', 'get',
+         lambda d: '/api/recipes/download_shopping_cart/', 'viewer', 200, 2),
+    case('recipes-download-shopping-cart', 'get',
+         lambda d: '/api/recipes/download_shopping_cart/?format=csv',
+         'viewer', 200, 2),
+    case('recipes-download-shopping-cart', 'get',
+         lambda d: '/api/recipes/download_shopping_cart/?format=json',
+         'viewer', 200, 2),
+    case('recipes-get-link', 'get',
+         lambda d: f'/api/recipes/{d.recipe.pk}/get-link/', 'viewer', 200, 1),
+    case('recipes-similar', 'get',
+         lambda d: f'/api/recipes/{d.recipe.pk}/similar/', 'viewer', 200, 1),
+
+    case('tags-list', 'get', lambda d: '/api/tags/', None, 200, 1),
+    case('tags-detail', 'get', lambda d: f'/api/tags/{d.tags[0].pk}/',
+         None, 200, 1),
+    case('ingredients-list', 'get', lambda d: '/api/ingredients/',
+         None, 200, 1),
+    case('ingredients-list', 'get',
+         lambda d: f'/api/ingredients/?name={d.prefix}', None, 200, 1),
+    case('ingredients-detail', 'get',
+         lambda d: f'/api/ingredients/{d.ingredients[0].pk}/', None, 200, 1),
+
+    case('users-list', 'get', lambda d: f'/api/users/?limit={d.size}',
+         'viewer', 200, 3),
+    case('users-list', 'post', lambda d: '/api/users/', None, 201, 5,
+         lambda d, i: {
+             'email': f'{d.prefix}-new@example.com',
+             'username': f'{d.prefix}-new',
+             'first_name': 'Новый', 'last_name': 'Пользователь',
+             'password': PASSWORD,
+         }),
+    case('users-detail', 'get', lambda d: f'/api/users/{d.authors[0].pk}/',
+         'viewer', 200, 2),
+    case('users-detail', 'put', lambda d: f'/api/users/{d.other.pk}/',
+         'other', 200, 3,
+         lambda d, i: {
+             'email': d.other.email, 'username': d.other.username,
+             'first_name': 'Имя', 'last_name': 'Фамилия',
+         }),
+    case('users-detail', 'patch', lambda d: f'/api/users/{d.other.pk}/',
+         'other', 200, 3, lambda d, i: {'first_name': 'Имя'}),
+    # Удаляется пользователь без рецептов, подписок и избранного.
+    case('users-detail', 'delete', lambda d: f'/api/users/{d.other.pk}/',
+         'other', 204, 13, lambda d, i: {'current_password': PASSWORD}),
+    case('users-me', 'get', lambda d: '/api/users/me/', 'viewer', 200, 1),
+    case('users-me', 'put', lambda d: '/api/users/me/', 'other', 200, 2,
+         lambda d, i: {
+             'email': d.other.email, 'username': d.other.username,
+             'first_name': 'Имя', 'last_name': 'Фамилия',
+         }),
+    case('users-me', 'patch', lambda d: '/api/users/me/', 'other', 200, 2,
+         lambda d, i: {'first_name': 'Имя'}),
+    case('users-me', 'delete', lambda d: '/api/users/me/', 'other', 204, 12,
+         lambda d, i: {'current_password': PASSWORD}),
+    case('users-avatar', 'put', lambda d: '/api/users/me/avatar/',
+         'viewer', 200, 1, lambda d, image: {'avatar': image}),
+    case('users-avatar', 'delete', lambda d: '/api/users/me/avatar/',
+         'viewer', 204, 1),
+    case('users-set-password', 'post', lambda d: '/api/users/set_password/',
+         'other', 204, 1,
+         lambda d, i: {
+             'current_password': PASSWORD, 'new_password': f'{PASSWORD}-2'
+         }),
+    case('users-set-username', 'post', lambda d: '/api/users/set_email/',
+         'other', 204, 2,
+         lambda d, i: {
+             'current_password': PASSWORD,
+             'new_email': f'{d.prefix}-changed@example.com',
+         }),
+    case('users-reset-password', 'post',
+         lambda d: '/api/users/reset_password/', None, 204, 1,
+         lambda d, i: {'email': d.other.email}),
+    case('users-reset-password-confirm', 'post',
+         lambda d: '/api/users/reset_password_confirm/', None, 400, 0,
+         lambda d, i: {'uid': 'x', 'token': 'x', 'new_password': PASSWORD}),
+    case('users-reset-username', 'post', lambda d: '/api/users/reset_email/',
+         None, 204, 1, lambda d, i: {'email': d.other.email}),
+    case('users-reset-username-confirm', 'post',
+         lambda d: '/api/users/reset_email_confirm/', None, 400, 1,
+         lambda d, i: {'uid': 'x', 'token': 'x', 'new_email': 'a@b.ru'}),
+    case('users-activation', 'post', lambda d: '/api/users/activation/',
+         None, 400, 0, lambda d, i: {'uid': 'x', 'token': 'x'}),
+    case('users-resend-activation', 'post',
+         lambda d: '/api/users/resend_activation/', None, 400, 1,
+         lambda d, i: {'email': d.other.email}),
+    case('users-subscribe', 'post',
+         lambda d: f'/api/users/{d.authors[0].pk}/subscribe/',
+         'other', 201, 10),
+    case('users-subscribe', 'delete',
+         lambda d: f'/api/users/{d.authors[0].pk}/subscribe/',
+         'viewer', 204, 6),
+    case('users-subscriptions', 'get',
+         lambda d: f'/api/users/subscriptions/?limit={d.size}'
+                   '&recipes_limit=2',
+         'viewer', 200, 4),
+    case('users-subscriptions-feed', 'get',
+         lambda d: f'/api/users/subscriptions/feed/?limit={d.size}',
+         'viewer', 200, 7),
+]
+
+
+@pytest.fixture(autouse=True)
+def reset_confirm_urls(settings):
+    """Адреса подтверждения, без которых djoser не отправляет письма."""
+    settings.DJOSER = {
+        **settings.DJOSER,
+        'PASSWORD_RESET_CONFIRM_URL': 'reset-password/{uid}/{token}',
+        'USERNAME_RESET_CONFIRM_URL': 'reset-email/{uid}/{token}',
+    }
+
+
+def iter_routes(patterns):
+    """Возвращает пары (имя маршрута, HTTP-метод) для urlpatterns API."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns)
+            continue
+        assert isinstance(pattern, URLPattern)
+        view = pattern.callback
+        view_class = getattr(view, 'cls', None)
+        allowed = set(view_class.http_method_names) - {'options', 'head'}
+        actions = getattr(view, 'actions', None)
+        if actions is not None:
+            methods = set(actions) & allowed
+        else:
+            methods = {method for method in allowed
+                       if hasattr(view_class, method)}
+        for method in methods:
+            yield pattern.name, method
+
+
+def test_every_route_has_budget():
+    routes = set(iter_routes(urls.urlpatterns))
+    covered = {(case.route, case.method) for case in CASES}
+    assert routes <= covered, sorted(routes - covered)
+
+
+@pytest.mark.parametrize('case', CASES, ids=[
+    f'{case.route}-{case.method}-{number}'
+    for number, case in enumerate(CASES)
+])
+def test_query_budget(case, seed, client_for, image,
+                      django_assert_max_num_queries):
+    counts = []
+    for size in SIZES:
+        data = seed(size)
+        user = getattr(data, case.user) if case.user else None
+        if case.route == 'logout':
+            Token.objects.create(user=user)
+        client = client_for(user)
+        body = case.body(data, image) if case.body else None
+        with django_assert_max_num_queries(case.budget) as queries:
+            response = getattr(client, case.method)(
+                case.path(data), body, format='json'
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        assert response.status_code == case.status, response.content
+        counts.append(len(queries))
+    assert len(set(counts)) == 1, (
+        f'число запросов зависит от размера данных: {counts}'
+    )
@@ -0,0 +1,108 @@
+"""Создание и изменение рецепта."""
+import pytest
+
+from recipes.models import RecipeIngredient
+
+
+@pytest.fixture
+def payload(seed, image):
+    data = seed(3)
+
+    def make_payload(**fields):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': image,
+            'tags': [data.tags[0].pk],
+            'ingredients': [{'id': data.ingredients[0].pk, 'amount': 1}],
+            **fields
+        }
+    make_payload.data = data
+    return make_payload
+
+
+def amounts(recipe):
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+@pytest.mark.parametrize('field', ['tags', 'ingredients'])
+def test_duplicates_rejected(payload, client_for, field):
+    data = payload.data
+    duplicate = getattr(data, field)[1].pk
+    values = {
+        'tags': [duplicate, data.tags[0].pk, duplicate],
+        'ingredients': [
+            {'id': duplicate, 'amount': 1},
+            {'id': duplicate, 'amount': 2},
+        ],
+    }
+    response = client_for(data.other).post(
+        '/api/recipes/', payload(**{field: values[field]}), format='json'
+    )
+    assert response.status_code == 400
+    assert list(response.data) == [field]
+    assert f'[{duplicate}]' in str(response.data[field])
+
+
+@pytest.mark.parametrize('field', ['tags', 'ingredients'])
+def test_missing_ids_rejected(payload, client_for, field):
+    data = payload.data
+    missing = data.own.pk + 1000
+    values = {
+        'tags': [data.tags[0].pk, missing],
+        'ingredients': [
+            {'id': data.ingredients[0].pk, 'amount': 1},
+            {'id': missing, 'amount': 1},
+        ],
+    }
+    response = client_for(data.other).post(
+        '/api/recipes/', payload(**{field: values[field]}), format='json'
+    )
+    assert response.status_code == 400
+    assert list(response.data) == [field]
+    assert str(missing) in str(response.data[field])
+    assert data.other.recipes.count() == 0
+
+
+def test_missing_ids_rejected_on_update(payload, client_for):
+    data = payload.data
+    response = client_for(data.viewer).patch(
+        f'/api/recipes/{data.own.pk}/',
+        payload(ingredients=[{'id': data.own.pk + 1000, 'amount': 1}]),
+        format='json'
+    )
+    assert response.status_code == 400
+    assert list(response.data) == ['ingredients']
+    assert amounts(data.own) == {data.ingredients[0].pk: 1}
+
+
+def test_update_diffs_ingredients(payload, client_for):
+    data = payload.data
+    first, _, third = data.ingredients
+    recipe = data.recipes[0]
+    kept = RecipeIngredient.objects.get(recipe=recipe, ingredient=first)
+
+    response = client_for(recipe.author).patch(
+        f'/api/recipes/{recipe.pk}/',
+        payload(
+            tags=[data.tags[2].pk],
+            ingredients=[
+                {'id': first.pk, 'amount': 1},
+                {'id': third.pk, 'amount': 7},
+            ]
+        ),
+        format='json'
+    )
+    assert response.status_code == 200
+    assert amounts(recipe) == {first.pk: 1, third.pk: 7}
+    assert RecipeIngredient.objects.filter(pk=kept.pk).exists()
+    assert [tag.pk for tag in recipe.tags.all()] == [data.tags[2].pk]
+    assert [
+        (item['id'], item['amount'])
+        for item in response.data['ingredients']
+    ] == [(first.pk, 1), (third.pk, 7)]
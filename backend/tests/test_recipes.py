@@ -0,0 +1,78 @@
+"""Выдача списка и карточки рецепта."""
+from recipes.models import Favorite
+
+
+def flags(response):
+    return {
+        item['id']: (item['is_favorited'], item['is_in_shopping_cart'])
+        for item in response.data['results']
+    }
+
+
+def test_flags_for_viewer(seed, client_for):
+    data = seed(2)
+    response = client_for(data.viewer).get('/api/recipes/?limit=100')
+
+    assert response.status_code == 200
+    result = flags(response)
+    assert all(result[recipe.pk] == (True, True) for recipe in data.recipes)
+    assert result[data.own.pk] == (False, False)
+
+
+def test_flags_for_other_user_and_anonymous(seed, client_for):
+    data = seed(2)
+    for user in (data.other, None):
+        response = client_for(user).get('/api/recipes/?limit=100')
+        assert set(flags(response).values()) == {(False, False)}
+
+
+def test_flags_in_detail(seed, client_for):
+    data = seed(2)
+    client = client_for(data.viewer)
+
+    recipe = client.get(f'/api/recipes/{data.recipe.pk}/').data
+    assert (recipe['is_favorited'], recipe['is_in_shopping_cart']) == (
+        True, True
+    )
+    own = client.get(f'/api/recipes/{data.own.pk}/').data
+    assert (own['is_favorited'], own['is_in_shopping_cart']) == (
+        False, False
+    )
+
+
+def test_filter_by_flags(seed, client_for):
+    data = seed(2)
+    client = client_for(data.viewer)
+    Favorite.objects.filter(
+        user=data.viewer, recipe=data.recipes[0]
+    ).delete()
+
+    favorited = client.get('/api/recipes/?limit=100&is_favorited=1')
+    in_cart = client.get('/api/recipes/?limit=100&is_in_shopping_cart=1')
+
+    assert set(flags(favorited)) == {
+        recipe.pk for recipe in data.recipes[1:]
+    }
+    assert set(flags(in_cart)) == {recipe.pk for recipe in data.recipes}
+
+
+def test_filter_by_tags(seed, client_for):
+    data = seed(3)
+    client = client_for(None)
+    first, *rest = data.recipes
+    first.tags.set([data.tags[2]])
+
+    response = client.get(f'/api/recipes/?limit=100&tags={data.prefix}-2')
+    assert [item['id'] for item in response.data['results']] == [first.pk]
+
+    response = client.get(
+        f'/api/recipes/?limit=100&tags={data.prefix}-0&tags={data.prefix}-1'
+    )
+    ids = [item['id'] for item in response.data['results']]
+    assert len(ids) == len(set(ids)) == response.data['count']
+    assert set(ids) == {recipe.pk for recipe in rest} | {data.own.pk}
+
+    response = client.get(
+        f'/api/recipes/?limit=100&tags={data.prefix}-1,{data.prefix}-2'
+    )
+    assert response.data['count'] == len(data.recipes)
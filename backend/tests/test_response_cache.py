@@ -0,0 +1,107 @@
+"""Кэш ответов для анонимных запросов списка и карточки рецепта."""
+import pytest
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+def recipe_name(client, recipe):
+    return client.get(f'/api/recipes/{recipe.pk}/').data['name']
+
+
+def test_repeated_request_served_from_cache(
+    seed, client_for, django_assert_num_queries
+):
+    seed(2)
+    client = client_for(None)
+    first = client.get('/api/recipes/?limit=3')
+    with django_assert_num_queries(0):
+        second = client.get('/api/recipes/?limit=3')
+    assert second.data == first.data
+
+
+def test_authenticated_requests_bypass_cache(seed, client_for):
+    data = seed(2)
+    client_for(None).get(f'/api/recipes/{data.recipe.pk}/')
+    response = client_for(data.viewer).get(f'/api/recipes/{data.recipe.pk}/')
+    assert response.data['is_favorited'] is True
+
+
+def test_recipe_update_invalidates(
+    seed, client_for, image, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    anonymous = client_for(None)
+    assert recipe_name(anonymous, data.own) == data.own.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client_for(data.viewer).patch(
+            f'/api/recipes/{data.own.pk}/', {
+                'name': 'Новое название',
+                'text': 'Описание',
+                'cooking_time': 5,
+                'image': image,
+                'tags': [data.tags[0].pk],
+                'ingredients': [{'id': data.ingredients[0].pk, 'amount': 1}],
+            }, format='json'
+        )
+    assert response.status_code == 200
+    assert recipe_name(anonymous, data.own) == 'Новое название'
+
+
+def test_recipe_delete_invalidates(
+    seed, client_for, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    anonymous = client_for(None)
+    assert anonymous.get(f'/api/recipes/{data.own.pk}/').status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client_for(data.viewer).delete(f'/api/recipes/{data.own.pk}/')
+    assert anonymous.get(f'/api/recipes/{data.own.pk}/').status_code == 404
+
+
+def test_last_login_keeps_cache(
+    seed, client_for, django_assert_num_queries,
+    django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    anonymous = client_for(None)
+    url = f'/api/recipes/{data.recipe.pk}/'
+    anonymous.get(url)
+
+    author = data.recipe.author
+    with django_capture_on_commit_callbacks(execute=True):
+        author.save(update_fields=['last_login'])
+    with django_assert_num_queries(0):
+        anonymous.get(url)
+
+
+def test_author_update_invalidates(
+    seed, client_for, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    anonymous = client_for(None)
+    url = f'/api/recipes/{data.recipe.pk}/'
+    assert anonymous.get(url).data['author']['first_name'] == 'Автор'
+
+    author = data.recipe.author
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Повар'
+        author.save()
+    assert anonymous.get(url).data['author']['first_name'] == 'Повар'
+
+
+def test_ingredient_rename_invalidates(
+    seed, client_for, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    anonymous = client_for(None)
+    url = f'/api/recipes/{data.recipe.pk}/'
+    anonymous.get(url)
+
+    ingredient = data.ingredients[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = 'переименованный'
+        ingredient.save()
+    names = {item['name'] for item in anonymous.get(url).data['ingredients']}
+    assert 'переименованный' in names
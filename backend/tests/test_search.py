@@ -0,0 +1,70 @@
+"""Полнотекстовый поиск рецептов."""
+import pytest
+
+from recipes.models import Ingredient
+
+
+@pytest.fixture
+def create_recipe(
+    seed, client_for, image, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    client = client_for(data.other)
+
+    def make_recipe(name, text='Описание', ingredient=data.ingredients[0]):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post('/api/recipes/', {
+                'name': name,
+                'text': text,
+                'cooking_time': 5,
+                'image': image,
+                'tags': [data.tags[0].pk],
+                'ingredients': [{'id': ingredient.pk, 'amount': 1}],
+            }, format='json')
+        assert response.status_code == 201
+        return response.data['id']
+    return make_recipe
+
+
+def search(client, query):
+    response = client.get('/api/recipes/', {'search': query, 'limit': 100})
+    assert response.status_code == 200
+    return [item['id'] for item in response.data['results']]
+
+
+def test_name_ranks_above_ingredients_and_text(create_recipe, client_for):
+    quinoa = Ingredient.objects.create(name='киноа', measurement_unit='г')
+    by_text = create_recipe('Гарнир', text='Подавать с киноа')
+    by_ingredient = create_recipe('Гарнир', ingredient=quinoa)
+    by_name = create_recipe('Салат киноа')
+
+    assert search(client_for(None), 'киноа') == [
+        by_name, by_ingredient, by_text
+    ]
+
+
+def test_no_matches(create_recipe, client_for):
+    create_recipe('Салат')
+    assert search(client_for(None), 'киноа') == []
+    assert search(client_for(None), '!!!') == []
+
+
+def test_yo_normalized(create_recipe, client_for):
+    recipe_id = create_recipe('Салат с ёжевикой')
+    assert search(client_for(None), 'ежевикой') == [recipe_id]
+    assert search(client_for(None), 'Ёжевикой') == [recipe_id]
+
+
+def test_ingredient_rename_refreshes_index(
+    create_recipe, client_for, django_capture_on_commit_callbacks
+):
+    ingredient = Ingredient.objects.create(name='рис', measurement_unit='г')
+    recipe_id = create_recipe('Гарнир', ingredient=ingredient)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = 'булгур'
+        ingredient.save()
+
+    client = client_for(None)
+    assert search(client, 'булгур') == [recipe_id]
+    assert search(client, 'рис') == []
@@ -0,0 +1,104 @@
+"""Выгрузка списка покупок."""
+import csv
+import io
+import json
+
+import pytest
+
+from recipes.models import RecipeIngredient, ShoppingCart
+
+
+@pytest.fixture
+def cart(seed):
+    """
+    Корзина пользователя other из двух рецептов.
+
+    В обоих рецептах по две единицы каждого ингредиента, кроме первого
+    ингредиента первого рецепта: его пять единиц.
+    """
+    data = seed(2)
+    first, second = data.recipes[:2]
+    RecipeIngredient.objects.filter(recipe__in=[first, second]).update(
+        amount=2
+    )
+    RecipeIngredient.objects.filter(
+        recipe=first, ingredient=data.ingredients[0]
+    ).update(amount=5)
+    for recipe in (first, second):
+        ShoppingCart.objects.create(user=data.other, recipe=recipe)
+    return data
+
+
+def download(client, file_format):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={file_format}'
+    )
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping_list.{file_format}"'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+def test_txt(cart, client_for):
+    first, second = cart.recipes[:2]
+    content = download(client_for(cart.other), 'txt')
+
+    assert content.startswith('Список покупок создан: ')
+    assert content.split('\n\n', 1)[1] == (
+        'ПРОДУКТЫ ДЛЯ ПРИГОТОВЛЕНИЯ (2 шт.):\n'
+        '1. S2 ингредиент 0 - 7 г\n'
+        '2. S2 ингредиент 1 - 4 г\n'
+        '\n'
+        'РЕЦЕПТЫ ДЛЯ ПРИГОТОВЛЕНИЯ (2 шт.):\n'
+        f'• {first.name} (автор: @{first.author.username})\n'
+        f'• {second.name} (автор: @{second.author.username})\n'
+    )
+
+
+def test_csv(cart, client_for):
+    first, second = cart.recipes[:2]
+    content = download(client_for(cart.other), 'csv')
+
+    assert list(csv.reader(io.StringIO(content))) == [
+        ['Продукт', 'Количество', 'Единица измерения'],
+        ['s2 ингредиент 0', '7', 'г'],
+        ['s2 ингредиент 1', '4', 'г'],
+        [],
+        ['Рецепт', 'Автор'],
+        [first.name, first.author.username],
+        [second.name, second.author.username],
+    ]
+
+
+def test_json(cart, client_for):
+    first, second = cart.recipes[:2]
+    document = json.loads(download(client_for(cart.other), 'json'))
+
+    assert document['products'] == [
+        {'name': 's2 ингредиент 0', 'amount': 7, 'measurement_unit': 'г'},
+        {'name': 's2 ингредиент 1', 'amount': 4, 'measurement_unit': 'г'},
+    ]
+    assert document['recipes'] == [
+        {'id': recipe.pk, 'name': recipe.name,
+         'author': recipe.author.username}
+        for recipe in (first, second)
+    ]
+    assert 'created_at' in document
+
+
+def test_empty_cart(seed, client_for):
+    data = seed(2)
+    client = client_for(data.other)
+
+    assert download(client, 'txt').split('\n\n', 1)[1] == (
+        'ПРОДУКТЫ ДЛЯ ПРИГОТОВЛЕНИЯ (0 шт.):\n'
+        '\n'
+        'РЕЦЕПТЫ ДЛЯ ПРИГОТОВЛЕНИЯ (0 шт.):\n'
+    )
+    assert json.loads(download(client, 'json'))['products'] == []
+
+
+def test_requires_authentication(client_for):
+    response = client_for(None).get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 401
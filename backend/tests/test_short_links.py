@@ -0,0 +1,76 @@
+"""Короткие ссылки на рецепты."""
+import pytest
+
+from recipes.models import ShortLink
+from recipes.short_links import short_links
+
+
+@pytest.fixture(autouse=True)
+def local_links():
+    """Очищает LRU коротких ссылок, общий для всех тестов процесса."""
+    short_links._entries.clear()
+    yield
+    short_links._entries.clear()
+
+
+def get_link(client, recipe_id):
+    response = client.get(f'/api/recipes/{recipe_id}/get-link/')
+    assert response.status_code == 200
+    prefix = 'http://testserver/s/'
+    assert response.data['short_link'].startswith(prefix)
+    return response.data['short_link'][len(prefix):].rstrip('/')
+
+
+def test_existing_link(seed, client_for):
+    data = seed(2)
+    code = ShortLink.objects.get(recipe=data.recipe).code
+    assert get_link(client_for(None), data.recipe.pk) == code
+
+
+def test_link_created_once(seed, client_for):
+    data = seed(2)
+    client = client_for(None)
+    code = get_link(client, data.own.pk)
+
+    assert not code.isdigit()
+    assert get_link(client, data.own.pk) == code
+    assert ShortLink.objects.filter(recipe=data.own).count() == 1
+
+
+def test_missing_recipe(seed, client_for):
+    data = seed(2)
+    response = client_for(None).get(
+        f'/api/recipes/{data.own.pk + 1000}/get-link/'
+    )
+    assert response.status_code == 404
+    assert not ShortLink.objects.filter(recipe_id=data.own.pk + 1000).exists()
+
+
+def test_redirect(seed, client):
+    data = seed(2)
+    code = ShortLink.objects.get(recipe=data.recipe).code
+
+    response = client.get(f'/s/{code}/')
+    assert response.status_code == 302
+    assert response['Location'] == f'/recipes/{data.recipe.pk}'
+    response = client.get(f'/s/{data.recipe.pk}/')
+    assert response.status_code == 302
+    assert response['Location'] == f'/recipes/{data.recipe.pk}'
+
+    assert client.get('/s/unknown/').status_code == 404
+    assert client.get('/s/not-a-code/').status_code == 404
+    assert client.get(f'/s/{data.own.pk + 1000}/').status_code == 404
+
+
+@pytest.mark.usefixtures('locmem_cache')
+def test_deleted_recipe_link(
+    seed, client, client_for, django_capture_on_commit_callbacks
+):
+    data = seed(2)
+    recipe = data.recipes[0]
+    code = ShortLink.objects.get(recipe=recipe).code
+    assert client.get(f'/s/{code}/').status_code == 302
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client_for(recipe.author).delete(f'/api/recipes/{recipe.pk}/')
+    assert client.get(f'/s/{code}/').status_code == 404
@@ -0,0 +1,74 @@
+"""Похожие рецепты."""
+import io
+import math
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import Favorite, ShoppingCart
+
+
+@pytest.fixture
+def interactions(seed):
+    """
+    Рецепты first и second добавили в избранное viewer и other, third —
+    только viewer, а other положил его в корзину. Остальные связи seed
+    удалены.
+    """
+    data = seed(2)
+    Favorite.objects.all().delete()
+    ShoppingCart.objects.all().delete()
+    first, second, third, _ = data.recipes
+    for recipe in (first, second, third):
+        Favorite.objects.create(user=data.viewer, recipe=recipe)
+    for recipe in (first, second):
+        Favorite.objects.create(user=data.other, recipe=recipe)
+    ShoppingCart.objects.create(user=data.other, recipe=third)
+    return data
+
+
+def build(**options):
+    call_command('build_similar_recipes', stdout=io.StringIO(), **options)
+
+
+def similar(client, recipe_id):
+    response = client.get(f'/api/recipes/{recipe_id}/similar/')
+    assert response.status_code == 200
+    return [(item['id'], item['similarity']) for item in response.data]
+
+
+def test_similar(interactions, client_for):
+    first, second, third, fourth = interactions.recipes
+    build(chunk_size=1)
+    client = client_for(None)
+
+    result = similar(client, first.pk)
+    assert [recipe_id for recipe_id, _ in result] == [second.pk, third.pk]
+    assert result[0][1] == pytest.approx(1.0)
+    assert result[1][1] == pytest.approx(1.5 / math.sqrt(2 * 1.25))
+    assert similar(client, fourth.pk) == []
+
+
+def test_limit(interactions, client_for):
+    first, second, *_ = interactions.recipes
+    build(limit=1)
+    assert [
+        recipe_id for recipe_id, _ in similar(client_for(None), first.pk)
+    ] == [second.pk]
+
+
+def test_rebuild_replaces_results(interactions, client_for):
+    first, second, third, _ = interactions.recipes
+    build()
+    Favorite.objects.filter(recipe=second).delete()
+    build()
+    assert [
+        recipe_id for recipe_id, _ in similar(client_for(None), first.pk)
+    ] == [third.pk]
+
+
+def test_missing_recipe(interactions, client_for):
+    response = client_for(None).get(
+        f'/api/recipes/{interactions.own.pk + 1000}/similar/'
+    )
+    assert response.status_code == 404
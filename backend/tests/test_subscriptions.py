@@ -0,0 +1,74 @@
+"""Подписки на авторов и их рецепты в ответе."""
+import pytest
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+def newest_first(recipes, limit=None):
+    return [
+        recipe.pk for recipe in sorted(
+            recipes,
+            key=lambda recipe: (recipe.created_at, recipe.pk),
+            reverse=True
+        )
+    ][:limit]
+
+
+def author_recipes(data, author):
+    return [recipe for recipe in data.recipes if recipe.author == author]
+
+
+@pytest.mark.parametrize('recipes_limit, limit', [
+    ('1', 1), ('2', 2), ('100', None), ('', None), ('0', None), ('x', None),
+])
+def test_recipes_limit(seed, client_for, recipes_limit, limit):
+    data = seed(3)
+    response = client_for(data.viewer).get(
+        SUBSCRIPTIONS_URL, {'recipes_limit': recipes_limit, 'limit': 100}
+    )
+
+    assert response.status_code == 200
+    authors = {item['id']: item for item in response.data['results']}
+    assert set(authors) == {author.pk for author in data.authors}
+    for author in data.authors:
+        item = authors[author.pk]
+        assert [recipe['id'] for recipe in item['recipes']] == newest_first(
+            author_recipes(data, author), limit
+        )
+        assert item['recipes_count'] == 3
+        assert item['is_subscribed'] is True
+
+
+def test_subscribe(seed, client_for):
+    data = seed(3)
+    author = data.authors[1]
+    client = client_for(data.other)
+
+    response = client.post(
+        f'/api/users/{author.pk}/subscribe/?recipes_limit=2'
+    )
+    assert response.status_code == 201
+    assert [recipe['id'] for recipe in response.data['recipes']] == (
+        newest_first(author_recipes(data, author), 2)
+    )
+    response = client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 400
+    assert [
+        item['id'] for item in client.get(SUBSCRIPTIONS_URL).data['results']
+    ] == [author.pk]
+
+
+def test_subscribe_errors(seed, client_for):
+    data = seed(2)
+    client = client_for(data.other)
+
+    assert client.post(
+        f'/api/users/{data.other.pk}/subscribe/'
+    ).status_code == 400
+    assert client.post(
+        f'/api/users/{data.own.pk + 1000}/subscribe/'
+    ).status_code == 404
+    assert client.delete(
+        f'/api/users/{data.authors[0].pk}/subscribe/'
+    ).status_code == 404
+    assert client_for(None).get(SUBSCRIPTIONS_URL).status_code == 401
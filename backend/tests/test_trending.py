@@ -0,0 +1,84 @@
+"""Сортировка рецептов по популярности."""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe, TrendingEpoch
+from recipes.trending import event_weight, get_epoch, renormalize_trending
+
+
+def trending(client):
+    response = client.get('/api/recipes/?ordering=-trending&limit=100')
+    assert response.status_code == 200
+    return [item['id'] for item in response.data['results']]
+
+
+def score(recipe):
+    recipe.refresh_from_db()
+    return recipe.trending_score
+
+
+def test_order_follows_favorites(seed, client_for):
+    data = seed(2)
+    first, *rest = data.recipes
+    newest_first = [recipe.pk for recipe in reversed(rest)]
+    client = client_for(data.other)
+
+    assert trending(client) == [
+        data.own.pk, *newest_first, first.pk
+    ]
+    client.post(f'/api/recipes/{first.pk}/favorite/')
+    assert trending(client) == [data.own.pk, first.pk, *newest_first]
+    client.post(f'/api/recipes/{first.pk}/shopping_cart/')
+    client.post(
+        '/api/recipes/favorite/', {'recipes': [first.pk]}, format='json'
+    )
+    assert trending(client)[0] == first.pk
+
+
+def test_removal_subtracts_same_weight(seed, client_for):
+    data = seed(2)
+    before = score(data.recipe)
+    client = client_for(data.other)
+
+    client.post(f'/api/recipes/{data.recipe.pk}/favorite/')
+    assert score(data.recipe) == pytest.approx(before + 1.0, rel=1e-3)
+    client.delete(f'/api/recipes/{data.recipe.pk}/favorite/')
+    assert score(data.recipe) == pytest.approx(before)
+
+
+def test_newer_events_weigh_more(settings):
+    settings.TRENDING_HALF_LIFE = 60
+    started_at = timezone.now()
+    assert event_weight(1.0, started_at, started_at) == 1.0
+    assert event_weight(
+        1.0, started_at, started_at + timedelta(seconds=120)
+    ) == 4.0
+
+
+def test_renormalize(seed, settings):
+    data = seed(2)
+    settings.TRENDING_HALF_LIFE = 3600
+    get_epoch()
+    TrendingEpoch.objects.update(
+        started_at=timezone.now() - timedelta(hours=1)
+    )
+    before = score(data.own)
+
+    factor = renormalize_trending()
+
+    assert factor == pytest.approx(0.5, rel=1e-3)
+    assert score(data.own) == pytest.approx(before * factor)
+    assert Recipe.objects.filter(trending_score=0).count() == 0
+
+
+@pytest.mark.usefixtures('locmem_cache')
+def test_trending_not_cached(seed, client_for):
+    data = seed(2)
+    first = data.recipes[0]
+    anonymous = client_for(None)
+    assert trending(anonymous)[-1] == first.pk
+
+    client_for(data.other).post(f'/api/recipes/{first.pk}/favorite/')
+    assert trending(anonymous)[1] == first.pk